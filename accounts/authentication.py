@@ -0,0 +1,20 @@
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .tokens import token_issued_at, tokens_revoked
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticate with the claims of the access token only.
+
+    `request.user` is a TokenUser: no user or profile query is made. Only
+    the revocation mark of the user is read from the cache, so tokens issued
+    before a logout or a deactivation are still rejected.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if tokens_revoked(user.id, token_issued_at(validated_token)):
+            raise InvalidToken('Token has been revoked')
+        return user
@@ -1,38 +1,64 @@
-import jwt
+import logging
+
+from django.db import transaction
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
+from .tokens import ProfileRefreshToken
 from rest_framework.exceptions import AuthenticationFailed
 from .utils import create_cookie_response
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth.models import User
 
+logger = logging.getLogger(__name__)
+
 
 class RefreshTokenView(APIView):
     def post(self, request):
+        """
+        Rotate the refresh token stored in the `refresh_token` cookie.
+
+        The user and its profile are loaded with a single joined query.
+        The presented token is blacklisted and its replacement issued in
+        the same transaction; a token that was already rotated, even by a
+        concurrent request, is refused.
+
+        Returns:
+            Response: A new access token, with the new refresh token set
+            as a cookie.
+        """
         refresh_token = request.COOKIES.get('refresh_token')
         if not refresh_token:
             raise AuthenticationFailed('Refresh token not provided or expired')
         try:
-            token = RefreshToken(refresh_token)
-            user_id = token.get('user_id')
-            # Retrieve the user from the database
-            user = User.objects.get(id=user_id)
-
-            # Generate a new refresh token for the user
-            new_refresh_token = RefreshToken.for_user(user)
-            response = create_cookie_response(
-                key='refresh_token',
-                value=str(new_refresh_token),
-                message='Token refreshed successfully.',
-                status_code=status.HTTP_200_OK,
-                access_token=str(new_refresh_token.access_token),
-                is_profile_professional = user.profile.is_professional
-            )
-            return response
+            token = ProfileRefreshToken(refresh_token)
+        except TokenError as e:
+            logger.info('Refresh token rejected', extra={'reason': str(e)})
+            raise AuthenticationFailed('Invalid refresh token')
+
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            logger.warning('Refresh token without user id', extra={'jti': token.get('jti')})
+            raise AuthenticationFailed('Invalid refresh token')
+        try:
+            user = User.objects.select_related('profile').get(id=user_id, is_active=True)
         except User.DoesNotExist:
+            logger.info('Refresh token of unknown user', extra={'user_id': user_id})
             raise AuthenticationFailed('User not found')
-        except Exception as e:
-            print(f"Error occurred: {e}")
-            print(f"Exception type: {type(e)}")
-            raise AuthenticationFailed('Invalid refresh token')
\ No newline at end of file
+
+        with transaction.atomic():
+            _, blacklisted = token.blacklist()
+            if not blacklisted:
+                # Lost a race with another refresh of the same token
+                logger.warning('Refresh token reused', extra={'user_id': user_id})
+                raise AuthenticationFailed('Invalid refresh token')
+            new_refresh_token = ProfileRefreshToken.for_user(user)
+
+        return create_cookie_response(
+            key='refresh_token',
+            value=str(new_refresh_token),
+            message='Token refreshed successfully.',
+            status_code=status.HTTP_200_OK,
+            access_token=str(new_refresh_token.access_token),
+            is_profile_professional=user.profile.is_professional
+        )
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from accounts.models import Profile
+from accounts.tokens import ProfileRefreshToken
+from config.benchmarking import environment, summarize, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures token/refresh/ throughput: concurrent clients rotate their '
+        'refresh token in a loop and the refreshes per second are reported'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Refreshes per client.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Clients refreshing in parallel, one thread each.'
+        )
+        parser.add_argument(
+            '--username', default='loadtest-user',
+            help='User owning the tokens, created if missing.'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='Path of an optional JSON report.'
+        )
+
+    def get_user(self, username):
+        user, _ = User.objects.get_or_create(username=username)
+        Profile.objects.get_or_create(user=user, defaults={'is_particular': True})
+        return User.objects.select_related('profile').get(pk=user.pk)
+
+    def refresh_loop(self, user, count, results):
+        """
+        Rotate one refresh token `count` times, each response cookie being
+        sent with the next request as a browser would.
+        """
+        client = Client()
+        client.cookies['refresh_token'] = str(ProfileRefreshToken.for_user(user))
+        url = reverse('token_refresh')
+        timings, failures = [], 0
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post(url)
+            timings.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures += 1
+                client.cookies['refresh_token'] = str(ProfileRefreshToken.for_user(user))
+        results.append((timings, failures))
+
+    def run_thread(self, *args):
+        try:
+            self.refresh_loop(*args)
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        user = self.get_user(options['username'])
+        count, concurrency = options['requests'], max(1, options['concurrency'])
+        results = []
+
+        start = time.perf_counter()
+        if concurrency == 1:
+            self.refresh_loop(user, count, results)
+        else:
+            threads = [
+                threading.Thread(target=self.run_thread, args=(user, count, results))
+                for _ in range(concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+
+        timings = [t for thread_timings, _ in results for t in thread_timings]
+        failures = sum(f for _, f in results)
+        report = dict(
+            summarize(timings),
+            concurrency=concurrency,
+            failures=failures,
+            refreshes_per_second=round(len(timings) / elapsed, 1),
+        )
+        if options['output']:
+            write_report(options['output'], {'environment': environment(), 'refresh': report})
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings)} refreshes in {elapsed:.1f}s '
+            f'({report["refreshes_per_second"]} refreshes/s, '
+            f'p50 {report["p50_ms"]}ms, p99 {report["p99_ms"]}ms, {failures} failures)'
+        ))
@@ -2,7 +2,9 @@ from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import Profile
+from .tokens import ProfileRefreshToken
 
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -48,4 +50,8 @@ class LoginSerializer(serializers.Serializer):
             if user is None:
                 raise AuthenticationFailed('Invalid credentials.')
         data['user'] = user
-        return data
\ No newline at end of file
+        return data
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ProfileRefreshToken
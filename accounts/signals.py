@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .models import Profile
+from .tokens import remember_blacklist_state, revoke_user_tokens
+
+
+def _admin_claims(user):
+    # Read from __dict__ so deferred fields are not loaded
+    return (user.__dict__.get('is_staff'), user.__dict__.get('is_superuser'))
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._loaded_admin_claims = _admin_claims(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    loaded = instance._loaded_admin_claims
+    instance._loaded_admin_claims = _admin_claims(instance)
+    if created:
+        return
+    # Access tokens carry is_staff and is_superuser, which grant admin views
+    if not instance.is_active or loaded != instance._loaded_admin_claims:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, created, **kwargs):
+    # Access tokens carry the profile flags, the next refresh reissues them
+    if not created:
+        revoke_user_tokens(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, **kwargs):
+    # Covers the admin and simplejwt views as well as our own tokens
+    remember_blacklist_state(
+        instance.token.jti, instance.token.expires_at.timestamp(), True
+    )
@@ -0,0 +1,111 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from config.metrics import TOKEN_BLACKLIST_LOOKUP
+
+
+def _revoked_key(user_id):
+    return f'jwt:revoked-before:{user_id}'
+
+
+def _blacklist_key(jti):
+    return f'jwt:blacklist:{jti}'
+
+
+def revoke_user_tokens(user_id):
+    """
+    Reject every access token issued to the user until now.
+
+    Stateless authentication never reads the user row, so logouts,
+    deactivations and profile changes are recorded here instead, in the
+    cache shared by every process (see config/prod.py). The mark only has
+    to outlive the access tokens it revokes.
+    """
+    cache.set(
+        _revoked_key(user_id),
+        time.time(),
+        api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    )
+
+
+def tokens_revoked(user_id, issued_at):
+    """
+    Tell whether a token issued at `issued_at` (a timestamp) was revoked.
+
+    Tokens issued right after a revocation, e.g. by a new login in the
+    same second, are accepted.
+    """
+    revoked_before = cache.get(_revoked_key(user_id))
+    return revoked_before is not None and issued_at < revoked_before
+
+
+def token_issued_at(token):
+    """
+    Timestamp at which an access token was issued: its `issued_at` claim,
+    or `iat`, with a one second resolution, for tokens issued without it.
+    """
+    return token.get('issued_at', token.get('iat', 0))
+
+
+def remember_blacklist_state(jti, expires, blacklisted):
+    """
+    Cache whether the refresh token `jti` is blacklisted until it expires
+    (`expires` is a timestamp), after which it is rejected anyway.
+    """
+    if not settings.TOKEN_BLACKLIST_CACHE:
+        return
+    cache.set(
+        _blacklist_key(jti),
+        int(blacklisted),
+        max(1, int(expires - time.time()))
+    )
+
+
+class ProfileRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the profile flags, copied into its access tokens
+    so permissions can be checked without loading the user or profile.
+
+    With TOKEN_BLACKLIST_CACHE, blacklist checks are answered from the
+    shared cache, which is written when a token is issued or blacklisted;
+    the database is only read for tokens the cache does not know about.
+    Without it, they always read the database.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['is_professional'] = user.profile.is_professional
+        token['is_particular'] = user.profile.is_particular
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        remember_blacklist_state(token[api_settings.JTI_CLAIM], token['exp'], False)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # Compared with revocation marks, see tokens_revoked
+        access['issued_at'] = time.time()
+        return access
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        start = time.perf_counter()
+        blacklisted = None
+        if settings.TOKEN_BLACKLIST_CACHE:
+            blacklisted = cache.get(_blacklist_key(jti))
+        if blacklisted is None:
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            remember_blacklist_state(jti, self.payload['exp'], blacklisted)
+            source = 'database'
+        else:
+            source = 'cache'
+        TOKEN_BLACKLIST_LOOKUP.labels(source).observe(time.perf_counter() - start)
+        if blacklisted:
+            raise TokenError('Token is blacklisted')
@@ -4,8 +4,11 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from django.contrib.auth.models import User
+from django.shortcuts import get_object_or_404
 from .serializers import UserSerializer, LoginSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import ProfileRefreshToken, revoke_user_tokens
 from .utils import (
     create_cookie_response,
     delete_cookie_response
@@ -31,7 +34,7 @@ def login(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = ProfileRefreshToken.for_user(user)
         response = create_cookie_response(
             key='refresh_token',
             value=str(refresh),
@@ -45,6 +48,14 @@ def login(request):
 
 @api_view(['POST'])
 def logout(request):
+    refresh_token = request.COOKIES.get('refresh_token')
+    if refresh_token:
+        try:
+            ProfileRefreshToken(refresh_token).blacklist()
+        except TokenError:
+            pass
+    if request.user.is_authenticated:
+        revoke_user_tokens(request.user.id)
     response = delete_cookie_response(
         key='refresh_token',
         message='User logged out successfully.',
@@ -55,12 +66,19 @@ def logout(request):
 
 class Account(APIView):
     permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        # The token user only holds claims, the account needs the full row
+        return get_object_or_404(
+            User.objects.select_related('profile'), pk=self.request.user.id
+        )
+
     def get(self, request):
-        user = request.user
+        user = self.get_object()
         return Response(UserSerializer(user).data)
 
     def put(self, request):
-        user = request.user
+        user = self.get_object()
         serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
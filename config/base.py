@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'offers',
@@ -54,10 +55,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.PrometheusMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.instrumentation.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -96,6 +99,76 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared Redis cache when REDIS_URL is set, process-local memory otherwise.
+# Cache versions (contract types, search results, offer feed) and token
+# revocations are only seen by every process through a shared cache, so
+# process-local memory only suits a single process (runserver, tests).
+# With REQUIRE_SHARED_CACHE, `manage.py check` rejects it (config/checks.py).
+REQUIRE_SHARED_CACHE = False
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds clients may reuse the contract type catalogue before revalidating
+CONTRACT_TYPE_CACHE_MAX_AGE = 60 * 5
+
+# Ranked offer ids cached per normalized search, invalidated on offer writes
+SEARCH_CACHE_TIMEOUT = 60 * 10
+SEARCH_CACHE_MAX_RESULTS = 1000
+
+# Values counted per facet of an offer search, and the salary band bounds
+SEARCH_FACET_LIMIT = 20
+SEARCH_FACET_SALARY_BANDS = [20000, 30000, 40000, 50000, 60000, 70000]
+
+
+# Offers
+
+# Largest payload accepted by the bulk import and rows per INSERT statement
+OFFER_BULK_MAX_ROWS = 10000
+OFFER_BULK_BATCH_SIZE = 500
+
+# Offers per page of the offer list: default, largest accepted, and the
+# planner estimate under which `count=estimate` counts exactly
+OFFER_PAGE_SIZE = 10
+OFFER_MAX_PAGE_SIZE = 100
+OFFER_COUNT_ESTIMATE_THRESHOLD = 1000
+
+# Offers read per server-side cursor fetch by the export endpoint
+OFFER_EXPORT_CHUNK_SIZE = 2000
+
+# Newest offer ids kept in the shared cache for the public feed, and
+# seconds before they are reloaded, should a process miss an update
+OFFER_FEED_SIZE = 1000
+OFFER_FEED_TIMEOUT = 60
+
+# Radius of offer searches `near` a zip code, in km
+SEARCH_RADIUS_DEFAULT_KM = 30
+SEARCH_RADIUS_MAX_KM = 200
+
+# Completions returned by offers/suggestions/, and seconds a process serves
+# its in-memory suggestion index before checking for offer changes
+SUGGESTION_LIMIT = 5
+SUGGESTION_MAX_LIMIT = 20
+SUGGESTION_INDEX_MAX_AGE = 30
+
+# Serve offer reads with the async views, for ASGI deployments (see config/gunicorn.py)
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -135,7 +208,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.TokenAuthentication',
@@ -152,17 +225,59 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'COOKIE_SECURE': False,  # Set True in production with HTTPS
+    # Tokens carry the profile flags read by the permissions
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ProfileTokenObtainPairSerializer',
 }
 
+# Answer refresh token blacklist checks from the cache, only when it is
+# shared by every process (a blacklisting must be seen by all of them)
+TOKEN_BLACKLIST_CACHE = bool(REDIS_URL)
+
+# Expired refresh tokens are purged from the blacklist tables by a beat job
+TOKEN_PURGE_BATCH_SIZE = 1000
+
+# Celery beat schedule, installed in the database by django_celery_beat
+CELERY_BEAT_SCHEDULE = {
+    'purge-expired-tokens': {
+        'task': 'accounts.tasks.purge_expired_tokens',
+        'schedule': timedelta(hours=1),
+    },
+}
+
+# Prometheus
+# Addresses allowed to scrape /metrics (comma separated), staff may too
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
 # Sentry settings
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration 
-sentry_sdk.init(
-    dsn="https://260e1d1b1606aee340cc32e90e773090@o1009241.ingest.us.sentry.io/4508128253378560",
-    integrations=[DjangoIntegration()], 
-    send_default_pii= True , 
-    traces_sample_rate= 1.0
-)
+# The SDK is only initialised when SENTRY_DSN is set
+
+SENTRY_DSN = os.environ.get('SENTRY_DSN')
+SENTRY_SEND_DEFAULT_PII = os.environ.get('SENTRY_SEND_DEFAULT_PII') == 'True'
+
+# Share of transactions traced, per URL name, and for everything else
+SENTRY_TRACES_SAMPLE_RATE = float(os.environ.get('SENTRY_TRACES_SAMPLE_RATE', 0.05))
+SENTRY_TRACES_SAMPLE_RATES = {
+    'offer-list': 0.5,
+    'metrics': 0.0,
+}
+# Share of traced transactions also profiled
+SENTRY_PROFILES_SAMPLE_RATE = float(os.environ.get('SENTRY_PROFILES_SAMPLE_RATE', 0.0))
+
+if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+    from config.instrumentation import traces_sampler
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        integrations=[DjangoIntegration()],
+        send_default_pii=SENTRY_SEND_DEFAULT_PII,
+        traces_sampler=traces_sampler,
+        profiles_sample_rate=SENTRY_PROFILES_SAMPLE_RATE,
+    )
+
+# Staff can profile a request by sending an X-Profile header
+# when enabled (config/dev.py, or PROFILING_ENABLED=True)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == 'True'
 
 
 # Mail settings
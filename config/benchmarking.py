@@ -0,0 +1,95 @@
+import json
+import math
+import subprocess
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(samples, q):
+    """
+    Return the `q`-th percentile (0-100) of `samples` by linear
+    interpolation between the closest ranks.
+    """
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(timings):
+    """
+    Summarize durations in seconds as latency statistics in milliseconds,
+    `None` when there are no durations.
+    """
+    if not timings:
+        return {
+            'iterations': 0, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None,
+        }
+    return {
+        'iterations': len(timings),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+    }
+
+
+def measure(fn, iterations, warmup=1, setup=None):
+    """
+    Time `fn` over `iterations` calls.
+
+    Args:
+        fn (callable): The code under test.
+        iterations (int): Number of timed calls.
+        warmup (int): Untimed calls made first to fill connection and
+            process caches.
+        setup (callable): Called before every call, outside of the timing
+            (e.g. to clear a cache for cold measurements).
+
+    Returns:
+        dict: Latency percentiles in milliseconds and the number of SQL
+        queries of the most expensive call.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        queries = max(queries, len(captured))
+    return dict(summarize(timings), queries=queries)
+
+
+def environment():
+    """
+    Describe where a report was produced, so reports can be compared
+    between commits.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'database': f'{connection.vendor} {connection.pg_version}'
+        if connection.vendor == 'postgresql' else connection.vendor,
+    }
+
+
+def write_report(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
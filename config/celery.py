@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+import config.metrics  # noqa: F401 (records task durations)
 
 # Set default Django settings module for Celery
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.dev')
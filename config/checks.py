@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    With REQUIRE_SHARED_CACHE, reject a process-local default cache, which
+    would keep cache invalidations and token revocations to one process.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.REQUIRE_SHARED_CACHE and backend.endswith('.LocMemCache'):
+        return [Error(
+            'The default cache is local to each process.',
+            hint='Set REDIS_URL to a cache shared by every process.',
+            id='config.E001',
+        )]
+    return []
@@ -2,6 +2,9 @@ from .base import *
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '*'] 
 
+# Staff can profile requests with the X-Profile header
+PROFILING_ENABLED = True
+
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
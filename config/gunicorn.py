@@ -0,0 +1,9 @@
+# gunicorn -c config/gunicorn.py config.wsgi
+# or, for the async read views (see ASYNC_READ_VIEWS):
+# gunicorn -c config/gunicorn.py -k uvicorn.workers.UvicornWorker config.asgi
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the live samples of a worker that exited from /metrics
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,117 @@
+import cProfile
+import io
+import pstats
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from accounts.authentication import StatelessJWTAuthentication
+
+
+def traces_sampler(sampling_context):
+    """
+    Decide the share of Sentry transactions traced.
+
+    Requests are sampled by the URL name of their view, from
+    SENTRY_TRACES_SAMPLE_RATES, falling back to SENTRY_TRACES_SAMPLE_RATE
+    for other views and for Celery tasks. A decision already taken by an
+    upstream service is kept.
+    """
+    parent_sampled = sampling_context.get('parent_sampled')
+    if parent_sampled is not None:
+        return float(parent_sampled)
+
+    environ = sampling_context.get('wsgi_environ')
+    scope = sampling_context.get('asgi_scope')
+    if environ is not None:
+        path = environ.get('PATH_INFO')
+    elif scope is not None:
+        path = scope.get('path')
+    else:
+        path = None
+
+    if path is not None:
+        try:
+            url_name = resolve(path).url_name
+        except Resolver404:
+            url_name = None
+        if url_name in settings.SENTRY_TRACES_SAMPLE_RATES:
+            return settings.SENTRY_TRACES_SAMPLE_RATES[url_name]
+    return settings.SENTRY_TRACES_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """
+    Profile a single request with cProfile on demand.
+
+    When a staff user sends an `X-Profile` header, the request is run
+    under the profiler and the response is replaced by the profile
+    statistics as plain text, sorted by the header value (`cumulative`
+    by default, or any pstats sort key such as `tottime`). Every other
+    request only pays for a header lookup.
+    """
+    sort_keys = {'calls', 'cumulative', 'ncalls', 'pcalls', 'time', 'tottime'}
+    max_rows = 60
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def authenticated_user(self, request):
+        try:
+            authenticated = StatelessJWTAuthentication().authenticate(request)
+        except (AuthenticationFailed, InvalidToken):
+            return None
+        return authenticated and authenticated[0]
+
+    def is_staff(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        user = self.authenticated_user(request)
+        return user is not None and user.is_staff
+
+    async def ais_staff(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            user = await sync_to_async(self.authenticated_user)(request)
+        return user is not None and user.is_staff
+
+    def report(self, profiler, sort):
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(sort if sort in self.sort_keys else 'cumulative')
+        stats.print_stats(self.max_rows)
+        return HttpResponse(stream.getvalue(), content_type='text/plain')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sort = request.META.get('HTTP_X_PROFILE')
+        if sort is None or not settings.PROFILING_ENABLED or not self.is_staff(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.runcall(self.get_response, request)
+        return self.report(profiler, sort)
+
+    async def __acall__(self, request):
+        # Only code run on the event loop thread is profiled, not the
+        # queries run in worker threads
+        sort = request.META.get('HTTP_X_PROFILE')
+        if sort is None or not settings.PROFILING_ENABLED or not await self.ais_staff(request):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.report(profiler, sort)
@@ -0,0 +1,181 @@
+"""
+Prometheus instrumentation.
+
+Metrics are exposed at /metrics, to METRICS_ALLOWED_IPS and staff. Under a multi-process server (gunicorn,
+mod_wsgi, Celery prefork), set PROMETHEUS_MULTIPROC_DIR to an empty
+writable directory before the processes start: every process then writes
+its samples there and /metrics aggregates them. config/gunicorn.py marks
+exited workers as dead so their live gauges are dropped.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+REQUEST_LATENCY = Histogram(
+    'django_request_duration_seconds',
+    'Request latency by URL name.',
+    ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'django_request_db_queries',
+    'Database queries per request by URL name.',
+    ['view'],
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 89, float('inf')),
+)
+REQUEST_QUERY_TIME = Histogram(
+    'django_request_db_duration_seconds',
+    'Time spent in database queries per request by URL name.',
+    ['view'],
+)
+SEARCH_COMPONENTS = Counter(
+    'offer_search_components_total',
+    'Offer searches using each search path.',
+    ['component'],
+)
+SEARCH_LATENCY = Histogram(
+    'offer_search_duration_seconds',
+    'Time to rank the ids of an offer search, by combination of search paths.',
+    ['plan'],
+)
+SEARCH_FACETS_LATENCY = Histogram(
+    'offer_search_facets_duration_seconds',
+    'Time to count the facets of an offer search, by requested facets.',
+    ['facets'],
+)
+CACHE_REQUESTS = Counter(
+    'offer_cache_requests_total',
+    'Cache lookups by cache and result.',
+    ['cache', 'result'],
+)
+TASK_LATENCY = Histogram(
+    'celery_task_duration_seconds',
+    'Celery task run time by task name and final state.',
+    ['task', 'state'],
+)
+TOKEN_BLACKLIST_LOOKUP = Histogram(
+    'jwt_blacklist_lookup_duration_seconds',
+    'Refresh token blacklist checks by where the answer came from.',
+    ['source'],
+    buckets=(.0001, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, float('inf')),
+)
+TOKEN_TABLE_ROWS = Gauge(
+    'jwt_token_table_rows',
+    'Rows left in the token blacklist tables after the last purge.',
+    ['table'],
+    multiprocess_mode='mostrecent',
+)
+
+
+# Other request methods share one label value, so clients cannot create
+# label values at will
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class QueryStats:
+    """
+    Database execute wrapper counting queries and their total time.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class PrometheusMiddleware:
+    """
+    Record latency and database usage of every request, labelled by the
+    URL name of the view that served it (e.g. `offer-list`).
+
+    Under ASGI, queries run in worker threads the wrapper cannot see, so
+    only the latency is recorded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        start = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        view = self.observe(request, response, time.perf_counter() - start)
+        REQUEST_QUERIES.labels(view).observe(stats.count)
+        REQUEST_QUERY_TIME.labels(view).observe(stats.duration)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, duration):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        REQUEST_LATENCY.labels(view, method, response.status_code).observe(duration)
+        return view
+
+
+def metrics(request):
+    """
+    Expose the metrics in the Prometheus text format, to the scrapers of
+    METRICS_ALLOWED_IPS and to logged in staff.
+    """
+    user = getattr(request, 'user', None)
+    is_staff = user is not None and user.is_staff
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not is_staff:
+        return HttpResponseForbidden()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+_task_started = {}
+
+
+@task_prerun.connect
+def _task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_LATENCY.labels(task.name, state or 'UNKNOWN').observe(
+            time.perf_counter() - started
+        )
@@ -1,9 +1,17 @@
 from rest_framework.permissions import BasePermission
+from accounts.models import Profile
+
 
 class IsOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.professional == request.user
+        return obj.professional_id == request.user.id
 
 class IsProfessional(BasePermission):
     def has_permission(self, request, view):
-        return request.user.profile.is_professional
+        # Access tokens carry the flag, other authentications need the profile
+        auth = request.auth
+        if hasattr(auth, 'get') and auth.get('is_professional') is not None:
+            return auth['is_professional']
+        return Profile.objects.filter(
+            user_id=request.user.id, is_professional=True
+        ).exists()
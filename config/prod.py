@@ -1,6 +1,17 @@
 from .base import *
+import logging
 import os
 
+# Error reporting and tracing are off without a DSN
+if not SENTRY_DSN:
+    logging.getLogger(__name__).warning(
+        'SENTRY_DSN is not set, errors will not be reported to Sentry.'
+    )
+
+# Several server processes must share cache invalidations and token
+# revocations (see Cache in config/base.py and config/checks.py)
+REQUIRE_SHARED_CACHE = True
+
 ALLOWED_HOSTS = ['35.180.198.48']
 
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID', '')
@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.urls import include, path
+from config.metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('offers/', include('offers.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
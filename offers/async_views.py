@@ -0,0 +1,96 @@
+"""
+Async read views for deployments under an ASGI server.
+
+They serve the same responses as the GET handlers of OfferView and
+get_all_contract_type, and are routed instead of them when
+ASYNC_READ_VIEWS is set (see offers/urls.py); other methods on the same
+URLs are still handled by the DRF views. Offer lists, the expensive
+reads, are built in the thread pool of the event loop with their own
+database connections, so the searches of one process run in parallel
+instead of one at a time on the thread shared by sync code.
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from accounts.authentication import StatelessJWTAuthentication
+from .cache import get_contract_type_catalogue
+from .models import Offer
+from .serializers import offer_values
+from .views import (
+    contract_type_response,
+    list_offers,
+    offer_list_response,
+    offer_response,
+)
+
+
+def read_view(async_view, sync_view):
+    """
+    Serve GET and HEAD requests with `async_view` and the other methods
+    with the DRF `sync_view`.
+    """
+    sync_view = sync_to_async(sync_view)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+    return view
+
+
+async def authenticate(request):
+    """
+    Return the requesting user: the bearer token first, then the session,
+    as the DRF authentication classes do.
+
+    Raises:
+        AuthenticationFailed: If a bearer token is invalid or revoked.
+    """
+    authenticated = await sync_to_async(StatelessJWTAuthentication().authenticate)(request)
+    if authenticated is not None:
+        return authenticated[0]
+    return await request.auser()
+
+
+def read_offers(params, user):
+    """
+    Run `list_offers` in a pool thread, whose connection is closed like a
+    request's once past CONN_MAX_AGE.
+    """
+    close_old_connections()
+    try:
+        return list_offers(params, user)
+    finally:
+        close_old_connections()
+
+
+async def offer_list(request):
+    try:
+        user = await authenticate(request)
+        # Read only, so not bound to the thread running sync code
+        data = await sync_to_async(read_offers, thread_sensitive=False)(request.GET, user)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': e.detail}, status=e.status_code)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=e.status_code)
+    catalogue = await sync_to_async(get_contract_type_catalogue)()
+    return offer_list_response(request, data, catalogue)
+
+
+async def offer_detail(request, pk):
+    try:
+        offer = await offer_values(Offer.objects.all()).aget(pk=pk)
+    except Offer.DoesNotExist:
+        return JsonResponse({'detail': 'No Offer matches the given query.'}, status=404)
+    catalogue = await sync_to_async(get_contract_type_catalogue)()
+    return offer_response(request, offer, catalogue)
+
+
+async def contract_types(request):
+    catalogue = await sync_to_async(get_contract_type_catalogue)()
+    return contract_type_response(request, catalogue, partial(JsonResponse, safe=False))
@@ -0,0 +1,478 @@
+import bisect
+import hashlib
+import heapq
+import json
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils.http import quote_etag
+
+from config.metrics import CACHE_REQUESTS, SEARCH_LATENCY
+from .facets import compute_facets
+from .models import ContractType, Offer, SuggestionTerm
+
+
+CONTRACT_TYPES_VERSION_KEY = 'offers:contract-types:version'
+CONTRACT_TYPES_KEY = 'offers:contract-types:{version}'
+SEARCH_GENERATION_KEY = 'offers:search:generation'
+SEARCH_KEY = 'offers:search:{generation}:{digest}'
+SEARCH_FACETS_KEY = 'offers:facets:{generation}:{digest}'
+SEARCH_HITS_KEY = 'offers:search:hits'
+SEARCH_MISSES_KEY = 'offers:search:misses'
+SUGGESTIONS_VERSION_KEY = 'offers:suggestions:version'
+FEED_GENERATION_KEY = 'offers:feed:generation'
+FEED_KEY = 'offers:feed:{generation}'
+
+
+class ContractTypeCatalogue:
+    """
+    Serialized contract types for one catalogue version.
+    """
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self.by_id = {contract['id']: contract for contract in data}
+        self.names = {contract['id']: contract['name'] for contract in data}
+        digest = hashlib.sha1(
+            json.dumps(data, sort_keys=True).encode()
+        ).hexdigest()
+        self.etag = quote_etag(digest)
+
+
+# Process-local copy, reused for as long as the shared version is unchanged
+_catalogue = None
+
+
+def _new_version():
+    # Time based so a version evicted from the shared cache never reuses
+    # the number of entries that may still be cached
+    return time.time_ns()
+
+
+def _current_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    # Only seen by other processes through a shared cache backend
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def _increment(key):
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def get_contract_type_catalogue():
+    """
+    Return the contract type catalogue.
+
+    The catalogue is served from process memory while its version matches
+    the one in the shared cache, then from the shared cache, and only hits
+    the database when neither holds the current version. Serving a warm
+    catalogue costs a single shared cache lookup.
+
+    Returns:
+        ContractTypeCatalogue: The current catalogue.
+    """
+    global _catalogue
+    version = _current_version(CONTRACT_TYPES_VERSION_KEY)
+    if _catalogue is not None and _catalogue.version == version:
+        CACHE_REQUESTS.labels('contract_types', 'local_hit').inc()
+        return _catalogue
+
+    key = CONTRACT_TYPES_KEY.format(version=version)
+    data = cache.get(key)
+    if data is None:
+        CACHE_REQUESTS.labels('contract_types', 'miss').inc()
+        data = list(ContractType.objects.order_by('id').values('id', 'name'))
+        cache.set(key, data, timeout=None)
+    else:
+        CACHE_REQUESTS.labels('contract_types', 'hit').inc()
+    _catalogue = ContractTypeCatalogue(version, data)
+    return _catalogue
+
+
+def invalidate_contract_type_catalogue():
+    """
+    Move every process to a new catalogue version.
+    """
+    _bump_version(CONTRACT_TYPES_VERSION_KEY)
+
+
+def fold_accents(text):
+    """
+    Strip diacritics, e.g. 'Développeur' becomes 'Developpeur'.
+    """
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', text)
+        if not unicodedata.combining(c)
+    )
+
+
+def normalize_text(text):
+    """
+    Lower-case, unaccent and collapse runs of whitespace, as the database
+    does with offers_normalize().
+    """
+    return fold_accents(' '.join(text.split()).lower())
+
+
+def normalize_search_terms(
+    title, zip_code, city, contract_ids, near='', radius=None,
+    salary_min=None, salary_max=None, sort='relevance'
+):
+    """
+    Reduce search parameters to a canonical form.
+
+    Case, accents and runs of whitespace do not change the results of a
+    search (the database folds them with offers_normalize()), so
+    equivalent queries share one cache entry. Contract ids are
+    deduplicated and sorted, and the radius only matters with a `near`
+    zip code.
+
+    Returns:
+        tuple: (title, zip_code, city, contract_ids, near, radius,
+        salary_min, salary_max, sort)
+    """
+    near = near.strip()
+    return (
+        normalize_text(title),
+        zip_code.strip(),
+        normalize_text(city),
+        sorted({str(contract_id).strip() for contract_id in contract_ids}),
+        near,
+        float(radius) if near else None,
+        salary_min,
+        salary_max,
+        sort,
+    )
+
+
+def search_plan(
+    title, zip_code, city, contract_ids, near='', radius=None,
+    salary_min=None, salary_max=None, sort='relevance'
+):
+    """
+    Name the search paths used by a search, e.g. `fts+trigram+contract`.
+    """
+    components = []
+    if title or zip_code or city:
+        components.append('fts')
+    if title:
+        components.append('trigram')
+    if contract_ids:
+        components.append('contract')
+    if near:
+        components.append('radius')
+    if salary_min is not None or salary_max is not None:
+        components.append('salary')
+    return '+'.join(components)
+
+
+class CachedSearchResults:
+    """
+    Ranked search results backed by a cached list of offer ids.
+
+    Implements the `count()` and slicing protocol used by Django's
+    Paginator. A page inside the cached ids is loaded by primary key, so
+    only its own rows are ranked; only a page past the cached prefix of a
+    very large result set falls back to the ranked queryset.
+    """
+
+    def __init__(self, queryset, ids, total):
+        self.queryset = queryset
+        self.ids = ids
+        self.total = total
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, key):
+        if key.stop <= len(self.ids) or len(self.ids) == self.total:
+            page_ids = self.ids[key]
+            return list(self.queryset.filter(pk__in=page_ids)) if page_ids else []
+        return list(self.queryset[key])
+
+
+def cached_search(terms, queryset):
+    """
+    Wrap the ranked search queryset for `terms` with the cached id list.
+
+    On a miss, the ranked ids (up to SEARCH_CACHE_MAX_RESULTS) and the
+    total are computed once and stored under the current search
+    generation, which is bumped on every offer write. Other processes
+    only see the bump through a shared cache, as in production.
+
+    Args:
+        terms (tuple): Normalized search terms, as returned by
+            `normalize_search_terms`.
+        queryset (QuerySet): The ranked search queryset for `terms`.
+
+    Returns:
+        CachedSearchResults: Results ready to be paginated.
+    """
+    digest = hashlib.sha1(json.dumps(terms).encode()).hexdigest()
+    key = SEARCH_KEY.format(
+        generation=_current_version(SEARCH_GENERATION_KEY), digest=digest
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        _increment(SEARCH_HITS_KEY)
+        CACHE_REQUESTS.labels('search', 'hit').inc()
+    else:
+        _increment(SEARCH_MISSES_KEY)
+        CACHE_REQUESTS.labels('search', 'miss').inc()
+        limit = settings.SEARCH_CACHE_MAX_RESULTS
+        with SEARCH_LATENCY.labels(search_plan(*terms)).time():
+            ids = list(queryset.values_list('id', flat=True)[:limit])
+            total = len(ids) if len(ids) < limit else queryset.count()
+        cached = {'ids': ids, 'total': total}
+        cache.set(key, cached, settings.SEARCH_CACHE_TIMEOUT)
+    return CachedSearchResults(queryset, cached['ids'], cached['total'])
+
+
+def cached_facets(terms, queryset, names):
+    """
+    Return the facet counts of the search for `terms`.
+
+    Counts are cached under the current search generation, like the
+    ranked ids, so paging through a search counts its facets once.
+
+    Args:
+        terms (tuple): Normalized search terms.
+        queryset (QuerySet): The search queryset for `terms`.
+        names (list): Facets to compute.
+
+    Returns:
+        dict: The facets, as returned by `compute_facets`.
+    """
+    digest = hashlib.sha1(json.dumps([terms, names]).encode()).hexdigest()
+    key = SEARCH_FACETS_KEY.format(
+        generation=_current_version(SEARCH_GENERATION_KEY), digest=digest
+    )
+    facets = cache.get(key)
+    if facets is not None:
+        CACHE_REQUESTS.labels('facets', 'hit').inc()
+        return facets
+    CACHE_REQUESTS.labels('facets', 'miss').inc()
+    facets = compute_facets(queryset, names, get_contract_type_catalogue().names)
+    cache.set(key, facets, settings.SEARCH_CACHE_TIMEOUT)
+    return facets
+
+
+def invalidate_search_results():
+    """
+    Start a new search generation, orphaning every cached result list.
+    """
+    _bump_version(SEARCH_GENERATION_KEY)
+
+
+def search_cache_stats():
+    hits = cache.get(SEARCH_HITS_KEY, 0)
+    misses = cache.get(SEARCH_MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else None,
+    }
+
+
+class SuggestionIndex:
+    """
+    In-memory prefix index over the SuggestionTerm dictionary.
+
+    Every word-initial suffix of a normalized term is a key ('saint-etienne'
+    is found by 'sai' and by 'eti'), kept sorted so the keys starting with
+    a prefix are one bisected range.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.checked_at = time.monotonic()
+        entries = {SuggestionTerm.TITLE: [], SuggestionTerm.CITY: []}
+        for kind, term, offer_count in rows:
+            normalized = normalize_text(term)
+            for word in re.finditer(r'\w+', normalized):
+                entries[kind].append((normalized[word.start():], term, offer_count))
+        self.keys = {}
+        self.terms = {}
+        for kind, kind_entries in entries.items():
+            kind_entries.sort()
+            self.keys[kind] = [key for key, _, _ in kind_entries]
+            self.terms[kind] = [(term, count) for _, term, count in kind_entries]
+
+    def suggest(self, kind, prefix, limit):
+        """
+        Return up to `limit` terms of `kind` with a word starting with the
+        normalized `prefix`, the most used first.
+        """
+        keys = self.keys[kind]
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\uffff', start)
+        matches = dict(self.terms[kind][start:end])
+        best = heapq.nsmallest(
+            limit, matches.items(), key=lambda match: (-match[1], match[0])
+        )
+        return [term for term, _ in best]
+
+
+# Process-local index, reloaded when the shared version changed, and the
+# thread reloading it
+_suggestion_index = None
+_suggestion_reload = None
+_suggestion_reload_lock = threading.Lock()
+
+
+def load_suggestion_index(version):
+    rows = (
+        SuggestionTerm.objects
+        .filter(offer_count__gt=0)
+        .values_list('kind', 'term', 'offer_count')
+    )
+    return SuggestionIndex(version, rows)
+
+
+def _reload_suggestion_index(version):
+    global _suggestion_index
+    try:
+        _suggestion_index = load_suggestion_index(version)
+    finally:
+        connection.close()
+
+
+def get_suggestion_index():
+    """
+    Return the suggestion index of this process.
+
+    The shared version is only checked once every SUGGESTION_INDEX_MAX_AGE
+    seconds, so completions cost no I/O at all in between, and bursts of
+    offer writes reload the dictionary at most once per period. Only the
+    first index is loaded by a request: later versions are loaded by a
+    background thread while the current index keeps being served.
+
+    Returns:
+        SuggestionIndex: The index.
+    """
+    global _suggestion_index, _suggestion_reload
+    index = _suggestion_index
+    now = time.monotonic()
+    if index is not None and now - index.checked_at < settings.SUGGESTION_INDEX_MAX_AGE:
+        CACHE_REQUESTS.labels('suggestions', 'local_hit').inc()
+        return index
+
+    version = _current_version(SUGGESTIONS_VERSION_KEY)
+    if index is not None and index.version == version:
+        CACHE_REQUESTS.labels('suggestions', 'hit').inc()
+        index.checked_at = now
+        return index
+
+    if index is None:
+        CACHE_REQUESTS.labels('suggestions', 'miss').inc()
+        _suggestion_index = load_suggestion_index(version)
+        return _suggestion_index
+
+    CACHE_REQUESTS.labels('suggestions', 'stale').inc()
+    index.checked_at = now
+    with _suggestion_reload_lock:
+        if _suggestion_reload is None or not _suggestion_reload.is_alive():
+            _suggestion_reload = threading.Thread(
+                target=_reload_suggestion_index, args=(version,), daemon=True
+            )
+            _suggestion_reload.start()
+    return index
+
+
+def invalidate_suggestion_index():
+    """
+    Make every process reload the suggestion dictionary once its index is
+    SUGGESTION_INDEX_MAX_AGE old. Only offer writes changing a title or a
+    city, or the number of offers, need it.
+    """
+    _bump_version(SUGGESTIONS_VERSION_KEY)
+
+
+def get_offer_feed():
+    """
+    Return the ids of the newest offers, newest first.
+
+    The list holds up to OFFER_FEED_SIZE ids and is kept in the shared
+    cache under the current feed generation for OFFER_FEED_TIMEOUT
+    seconds. On a miss it is read from the primary key index, which
+    never scans the table.
+
+    Returns:
+        dict: `ids`, and `complete` when they are the ids of every offer.
+    """
+    key = FEED_KEY.format(generation=_current_version(FEED_GENERATION_KEY))
+    feed = cache.get(key)
+    if feed is not None:
+        CACHE_REQUESTS.labels('feed', 'hit').inc()
+        return feed
+    CACHE_REQUESTS.labels('feed', 'miss').inc()
+    size = settings.OFFER_FEED_SIZE
+    ids = list(Offer.objects.order_by('-id').values_list('id', flat=True)[:size])
+    feed = {'ids': ids, 'complete': len(ids) < size}
+    cache.set(key, feed, settings.OFFER_FEED_TIMEOUT)
+    return feed
+
+
+def update_offer_feed(created=(), deleted=()):
+    """
+    Move the feed to a new generation with offers added or removed.
+
+    The feed of the previous generation is patched rather than reloaded.
+    When it is missing, e.g. still being built or patched by a
+    concurrent write, the new generation is left empty and reloaded by
+    the next read, so a lost update never outlives its generation.
+
+    Args:
+        created (iterable): Ids of the new offers.
+        deleted (iterable): Ids of the deleted offers.
+    """
+    try:
+        generation = cache.incr(FEED_GENERATION_KEY)
+    except ValueError:
+        _bump_version(FEED_GENERATION_KEY)
+        return
+    feed = cache.get(FEED_KEY.format(generation=generation - 1))
+    if feed is None:
+        return
+    ids, complete = feed['ids'], feed['complete']
+    # Ids older than the last one of a truncated feed are not listed, as
+    # the offers between them are not either
+    created = [pk for pk in created if complete or (ids and pk > ids[-1])]
+    ids = sorted(set(ids).union(created).difference(deleted), reverse=True)
+    size = settings.OFFER_FEED_SIZE
+    cache.set(
+        FEED_KEY.format(generation=generation),
+        {'ids': ids[:size], 'complete': complete and len(ids) <= size},
+        settings.OFFER_FEED_TIMEOUT,
+    )
+
+
+def invalidate_offer_feed():
+    """
+    Start a new feed generation, reloaded by the next read.
+    """
+    _bump_version(FEED_GENERATION_KEY)
@@ -0,0 +1,78 @@
+import csv
+import json
+
+
+# Formats served by the export endpoint, with their content type
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_HEADER = ['id', 'title', 'zip', 'city', 'salary', 'contract']
+
+
+class Echo:
+    """
+    File-like object handing back what csv.writer writes, so rows can be
+    formatted one at a time without a buffer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def offer_rows(offers, chunk_size):
+    """
+    Yield (id, title, zip, city, salary, contract_ids) tuples of `offers`.
+
+    Rows are read through a server-side cursor, `chunk_size` at a time,
+    and contract ids come from the search document, so neither the
+    offers nor their contracts are loaded as model instances.
+    """
+    return (
+        offers.order_by('id')
+        .values_list(
+            'id', 'title', 'zip', 'city', 'salary', 'search_document__contract_ids'
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def export_lines(rows, export_format, contract_names, chunk_size):
+    """
+    Format `rows` as NDJSON or CSV.
+
+    NDJSON lines hold the contracts as {id, name} objects like the offer
+    list, CSV lines their names separated by `|`. Lines are joined into
+    one string per `chunk_size` rows to keep the number of writes to the
+    client low.
+
+    Yields:
+        str: Formatted lines.
+    """
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        format_row = lambda row: writer.writerow([
+            *row[:5], '|'.join(contract_names.get(pk, '') for pk in row[5]),
+        ])
+        yield writer.writerow(CSV_HEADER)
+    else:
+        format_row = lambda row: json.dumps({
+            'id': row[0],
+            'title': row[1],
+            'zip': row[2],
+            'city': row[3],
+            'salary': row[4],
+            'contract': [
+                {'id': pk, 'name': contract_names.get(pk)} for pk in row[5]
+            ],
+        }, ensure_ascii=False) + '\n'
+
+    lines = []
+    for row in rows:
+        lines.append(format_row(row))
+        if len(lines) == chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db import connection
+
+from config.metrics import SEARCH_FACETS_LATENCY
+
+
+# Facets accepted by the `facets` query parameter
+FACETS = ('contract', 'city', 'salary')
+
+FACET_QUERIES = {
+    'contract': """
+        SELECT 'contract', contract_id::text, count(*)
+        FROM matches, unnest(matches.contract_ids) AS contract_id
+        GROUP BY contract_id ORDER BY 3 DESC, 2 LIMIT %s
+    """,
+    # Cities are grouped as the city filter matches them, ignoring case
+    # and accents, and named by their most common spelling
+    'city': """
+        SELECT 'city', mode() WITHIN GROUP (ORDER BY city), count(*)
+        FROM matches
+        GROUP BY offers_normalize(city) ORDER BY 3 DESC, 2 LIMIT %s
+    """,
+    'salary': """
+        SELECT 'salary', width_bucket(salary, %s::integer[])::text, count(*)
+        FROM matches
+        GROUP BY 2
+    """,
+}
+
+
+def salary_band(bucket, bands):
+    """
+    Bounds of a width_bucket() bucket, `None` for an open end.
+    """
+    return {
+        'min': bands[bucket - 1] if bucket > 0 else None,
+        'max': bands[bucket] if bucket < len(bands) else None,
+    }
+
+
+def compute_facets(queryset, names, contract_names):
+    """
+    Count the offers of `queryset` per value of each facet in `names`.
+
+    The search runs once, materialized in a CTE, and every facet is
+    grouped from it in the same statement. The contract and city facets
+    keep their SEARCH_FACET_LIMIT most common values; salaries are
+    counted per SEARCH_FACET_SALARY_BANDS band.
+
+    Args:
+        queryset (QuerySet): The offers to count, e.g. from search_offers.
+        names (list): Facets to compute, from FACETS.
+        contract_names (dict): Contract type names by id.
+
+    Returns:
+        dict: For each facet, a list of values and counts, most common
+        first (lowest band first for salaries).
+    """
+    # An empty queryset (e.g. a blank search) compiles to no SQL at all
+    if queryset.query.is_empty():
+        return {name: [] for name in names}
+    search_sql, search_params = (
+        queryset.order_by()
+        .values_list(
+            'search_document__contract_ids',
+            'search_document__city',
+            'search_document__salary',
+        )
+        .query.sql_with_params()
+    )
+    bands = settings.SEARCH_FACET_SALARY_BANDS
+    facet_params = {
+        'contract': [settings.SEARCH_FACET_LIMIT],
+        'city': [settings.SEARCH_FACET_LIMIT],
+        'salary': [bands],
+    }
+    sql = 'WITH matches (contract_ids, city, salary) AS MATERIALIZED ({}) {}'.format(
+        search_sql,
+        ' UNION ALL '.join(f'({FACET_QUERIES[name]})' for name in names),
+    )
+    params = list(search_params)
+    for name in names:
+        params.extend(facet_params[name])
+
+    with connection.cursor() as cursor:
+        with SEARCH_FACETS_LATENCY.labels('+'.join(names)).time():
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+    facets = {name: [] for name in names}
+    for name, value, count in rows:
+        if name == 'contract':
+            facets[name].append({
+                'id': int(value), 'name': contract_names.get(int(value)), 'count': count
+            })
+        elif name == 'city':
+            facets[name].append({'value': value, 'count': count})
+        else:
+            facets[name].append({**salary_band(int(value), bands), 'count': count})
+    if 'salary' in facets:
+        facets['salary'].sort(key=lambda band: band['min'] or 0)
+    return facets
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from config.benchmarking import environment, measure, write_report
+from offers.models import Offer, ContractType
+
+
+# (name, title, zip, city, contract names)
+SEARCHES = [
+    ('title', 'Développeur', '', '', []),
+    ('title_zip_city', 'Développeur Python', '75011', 'Paris', []),
+    ('contracts', '', '', '', ['CDI']),
+    ('title_contracts', 'Data', '', '', ['CDI', 'Freelance']),
+    ('misspelled_title', 'Comptabel', '', '', []),
+    ('misspelled_title_zip_city', 'Infirmeir', '69003', 'Lyon', []),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds offers at increasing dataset sizes and records search latency, '
+        'query counts and query plans into a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10000,100000,1000000',
+            help='Comma separated dataset sizes, seeded in increasing order.'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=50,
+            help='Timed runs per scenario.'
+        )
+        parser.add_argument(
+            '--output', default='benchmark-search.json',
+            help='Path of the JSON report.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes used to seed offers.'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete every offer before seeding the first size.'
+        )
+
+    def seed(self, size, options):
+        missing = size - Offer.objects.count()
+        if missing < 0:
+            raise CommandError(
+                f'The database already holds more than {size} offers, use --reset.'
+            )
+        if missing:
+            call_command(
+                'create_offers',
+                count=missing,
+                seed=options['seed'] + size,
+                workers=options['workers'],
+                stdout=self.stdout,
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE offers_offer, offers_offer_contract, offers_offersearchdocument')
+
+    def run_searches(self, iterations):
+        contract_ids = dict(ContractType.objects.values_list('name', 'id'))
+        client = Client()
+        url = reverse('offer-list')
+        results = {}
+        for name, title, zip_code, city, contracts in SEARCHES:
+            ids = [contract_ids[c] for c in contracts if c in contract_ids]
+            queryset = Offer.search_offers(title, zip_code, city, ids)
+            params = {'title': title, 'zip': zip_code, 'city': city, 'contract': ids}
+            results[name] = {
+                'search_offers': measure(
+                    lambda: list(queryset.all()[:10]), iterations
+                ),
+                'count': measure(lambda: queryset.all().count(), iterations),
+                'view_cold': measure(
+                    lambda: client.get(url, params), iterations, setup=cache.clear
+                ),
+                'view_warm': measure(lambda: client.get(url, params), iterations),
+                'explain': queryset[:10].explain(analyze=True, buffers=True).splitlines(),
+            }
+        return results
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        if options['reset']:
+            Offer.objects.all().delete()
+
+        report = {'environment': environment(), 'sizes': {}}
+        for size in sizes:
+            self.seed(size, options)
+            self.stdout.write(f'Benchmarking {size} offers...')
+            report['sizes'][str(size)] = self.run_searches(options['iterations'])
+        write_report(options['output'], report)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from config.benchmarking import environment, measure, write_report
+from offers.cache import get_contract_type_catalogue
+from offers.models import Offer
+from offers.serializers import (
+    OfferSerializer,
+    json_response,
+    offer_dict,
+    offer_values,
+    orjson,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares OfferSerializer with the values() based offer_dict() on '
+        'pages of increasing size and records their latency into a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10,100,1000',
+            help='Comma separated numbers of offers per page.'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=50,
+            help='Timed runs per scenario.'
+        )
+        parser.add_argument(
+            '--output', default='benchmark-serializers.json',
+            help='Path of the JSON report.'
+        )
+
+    def run(self, size, iterations):
+        offers = Offer.objects.order_by('id')
+        names = get_contract_type_catalogue().names
+        instances = list(offers.prefetch_related('contract')[:size])
+        rows = list(offer_values(offers)[:size])
+
+        def serializer_page():
+            page = offers.prefetch_related('contract')[:size]
+            return JsonResponse({'offers': OfferSerializer(page, many=True).data})
+
+        def fast_page():
+            page = offer_values(offers)[:size]
+            return json_response({'offers': [offer_dict(row, names) for row in page]})
+
+        results = {
+            # Fetching, serializing and encoding a page
+            'serializer': measure(serializer_page, iterations),
+            'fast': measure(fast_page, iterations),
+            # Serializing and encoding rows already in memory
+            'serializer_encode': measure(
+                lambda: JsonResponse({'offers': OfferSerializer(instances, many=True).data}),
+                iterations
+            ),
+            'fast_encode': measure(
+                lambda: json_response({'offers': [offer_dict(row, names) for row in rows]}),
+                iterations
+            ),
+        }
+        for name in ('serializer_encode', 'fast_encode'):
+            results[name]['per_offer_us'] = round(results[name]['mean_ms'] * 1000 / size, 2)
+        return results
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        if Offer.objects.count() < sizes[-1]:
+            raise CommandError(
+                f'Fewer than {sizes[-1]} offers, seed them with create_offers.'
+            )
+        report = {
+            'environment': environment(),
+            'encoder': 'orjson' if orjson is not None else 'json',
+            'sizes': {},
+        }
+        for size in sizes:
+            self.stdout.write(f'Benchmarking pages of {size} offers...')
+            report['sizes'][str(size)] = self.run(size, options['iterations'])
+        write_report(options['output'], report)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
@@ -0,0 +1,104 @@
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from config.benchmarking import environment, summarize, write_report
+from offers.management.commands.benchmark_search import SEARCHES
+from offers.models import ContractType
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares concurrent offer search throughput of running deployments, '
+        'e.g. the WSGI one and the ASGI one started with the same number of '
+        'workers, and writes a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+', metavar='NAME=URL',
+            help='Deployments to compare, e.g. wsgi=http://localhost:8000.'
+        )
+        parser.add_argument(
+            '--concurrency', default='1,8,32',
+            help='Comma separated numbers of simultaneous clients.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests per deployment and concurrency level.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Worker processes of each deployment, recorded in the report.'
+        )
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Use page mode, served from the search cache once warm. By '
+            'default cursor mode is used so every search reaches the database.'
+        )
+        parser.add_argument(
+            '--output', default='benchmark-servers.json',
+            help='Path of the JSON report.'
+        )
+
+    def search_urls(self, base_url, cached):
+        contract_ids = dict(ContractType.objects.values_list('name', 'id'))
+        urls = []
+        for _, title, zip_code, city, contracts in SEARCHES:
+            params = [('title', title), ('zip', zip_code), ('city', city)]
+            params += [('contract', contract_ids[c]) for c in contracts if c in contract_ids]
+            if not cached:
+                params.append(('cursor', ''))
+            urls.append(f'{base_url.rstrip("/")}/offers/?{urllib.parse.urlencode(params)}')
+        return urls
+
+    def fetch(self, url):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                json.load(response)
+                ok = response.status == 200
+        except (urllib.error.URLError, OSError, ValueError):
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def run(self, urls, concurrency, count):
+        with ThreadPoolExecutor(concurrency) as pool:
+            # One untimed round to open connections and warm the processes
+            list(pool.map(self.fetch, urls))
+            start = time.perf_counter()
+            results = list(pool.map(self.fetch, (urls[i % len(urls)] for i in range(count))))
+            elapsed = time.perf_counter() - start
+        timings = [duration for duration, ok in results if ok]
+        report = summarize(timings) if timings else {'iterations': 0}
+        report.update(
+            errors=sum(1 for _, ok in results if not ok),
+            requests_per_second=round(len(timings) / elapsed, 1),
+        )
+        return report
+
+    def handle(self, *args, **options):
+        targets = dict(target.split('=', 1) for target in options['targets'])
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        report = {
+            'environment': environment(),
+            'workers': options['workers'],
+            'cached': options['cached'],
+            'targets': {},
+        }
+        for name, base_url in targets.items():
+            urls = self.search_urls(base_url, options['cached'])
+            report['targets'][name] = {}
+            for level in levels:
+                result = self.run(urls, level, options['requests'])
+                report['targets'][name][str(level)] = result
+                self.stdout.write(
+                    f'{name} x{level}: {result["requests_per_second"]} req/s, '
+                    f'p95 {result.get("p95_ms")}ms, {result["errors"]} errors'
+                )
+        write_report(options['output'], report)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
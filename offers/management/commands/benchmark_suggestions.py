@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from config.benchmarking import environment, measure, write_report
+from offers.cache import get_suggestion_index
+from offers.models import Offer
+
+
+# Typed words, replayed one keystroke at a time
+WORDS = ['Développeur', 'Data', 'Paris', 'Lyon', 'Infirmier', 'Comptable']
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays typed words keystroke by keystroke against the suggestion '
+        'endpoint and against a full offer search, and records their latency '
+        'into a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=50,
+            help='Timed runs per keystroke.'
+        )
+        parser.add_argument(
+            '--output', default='benchmark-suggestions.json',
+            help='Path of the JSON report.'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        client = Client()
+        url = reverse('offer-suggestions')
+        get_suggestion_index()
+
+        results = {}
+        for word in WORDS:
+            for length in range(1, len(word) + 1):
+                prefix = word[:length]
+                queryset = Offer.search_offers(prefix, '', '', [])
+                results[prefix] = {
+                    'suggestions': measure(
+                        lambda: client.get(url, {'q': prefix}), iterations
+                    ),
+                    'search_offers': measure(
+                        lambda: list(queryset.all()[:10]), iterations
+                    ),
+                }
+
+        report = {
+            'environment': environment(),
+            'offers': Offer.objects.count(),
+            'keystrokes': results,
+        }
+        write_report(options['output'], report)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
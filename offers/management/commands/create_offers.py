@@ -1,24 +1,228 @@
-from django.core.management.base import BaseCommand
-from offers.models import Offer
+import multiprocessing
 import random
-import string
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from accounts.models import Profile
+from offers.cache import (
+    invalidate_offer_feed,
+    invalidate_search_results,
+    invalidate_suggestion_index,
+)
+from offers.models import Offer, ContractType
+
+
+CONTRACT_TYPES = ['CDI', 'CDD', 'Freelance', 'Stage', 'Alternance', 'Interim']
+
+JOBS = [
+    ('Développeur Python', 38000, 65000),
+    ('Développeur Full Stack', 36000, 60000),
+    ('Développeur Java', 38000, 62000),
+    ('Développeur Front-End React', 34000, 55000),
+    ('Ingénieur DevOps', 42000, 70000),
+    ('Data Scientist', 42000, 72000),
+    ('Data Analyst', 35000, 55000),
+    ('Architecte logiciel', 55000, 85000),
+    ('Chef de projet informatique', 45000, 70000),
+    ('Product Owner', 45000, 68000),
+    ('Technicien support', 24000, 32000),
+    ('Administrateur systèmes et réseaux', 32000, 50000),
+    ('Comptable', 28000, 42000),
+    ('Contrôleur de gestion', 38000, 55000),
+    ('Assistant administratif', 22000, 28000),
+    ('Responsable des ressources humaines', 40000, 60000),
+    ('Chargé de recrutement', 30000, 40000),
+    ('Juriste', 35000, 55000),
+    ('Commercial', 28000, 50000),
+    ('Chargé de communication', 28000, 38000),
+    ('Graphiste', 26000, 38000),
+    ('Vendeur', 20000, 25000),
+    ('Caissier', 19000, 22000),
+    ('Magasinier', 20000, 25000),
+    ('Préparateur de commandes', 20000, 24000),
+    ('Chauffeur livreur', 21000, 27000),
+    ('Cuisinier', 21000, 28000),
+    ('Serveur', 19000, 24000),
+    ('Boulanger', 20000, 27000),
+    ('Infirmier', 28000, 38000),
+    ('Aide-soignant', 22000, 27000),
+    ('Électricien', 24000, 34000),
+    ('Plombier chauffagiste', 24000, 35000),
+    ('Technicien de maintenance', 26000, 36000),
+    ('Mécanicien automobile', 22000, 30000),
+    ('Agent d\'entretien', 19000, 22000),
+    ('Professeur de mathématiques', 28000, 40000),
+    ('Conseiller clientèle', 22000, 28000),
+]
+
+LEVELS = ['', '', '', 'Junior', 'Senior', 'Confirmé', 'Stagiaire']
+
+# (city, zip codes, relative weight)
+CITIES = [
+    ('Paris', ['75001', '75008', '75011', '75015', '75017', '75020'], 40),
+    ('Marseille', ['13001', '13006', '13008'], 12),
+    ('Lyon', ['69001', '69003', '69007'], 12),
+    ('Toulouse', ['31000', '31200', '31400'], 9),
+    ('Nice', ['06000', '06100', '06200'], 6),
+    ('Nantes', ['44000', '44100', '44300'], 7),
+    ('Montpellier', ['34000', '34070', '34090'], 6),
+    ('Strasbourg', ['67000', '67100', '67200'], 5),
+    ('Bordeaux', ['33000', '33200', '33300'], 7),
+    ('Lille', ['59000', '59160', '59800'], 7),
+    ('Rennes', ['35000', '35200', '35700'], 5),
+    ('Reims', ['51100'], 3),
+    ('Toulon', ['83000', '83100', '83200'], 3),
+    ('Grenoble', ['38000', '38100'], 4),
+    ('Dijon', ['21000'], 3),
+    ('Angers', ['49000', '49100'], 3),
+    ('Nîmes', ['30000', '30900'], 2),
+    ('Clermont-Ferrand', ['63000', '63100'], 3),
+    ('Le Havre', ['76600', '76610'], 2),
+    ('Saint-Étienne', ['42000', '42100'], 2),
+    ('Tours', ['37000', '37100'], 2),
+    ('Limoges', ['87000', '87100'], 2),
+    ('Amiens', ['80000', '80090'], 2),
+    ('Metz', ['57000', '57050'], 2),
+    ('Besançon', ['25000'], 2),
+    ('Orléans', ['45000', '45100'], 2),
+    ('Rouen', ['76000', '76100'], 3),
+    ('Caen', ['14000'], 2),
+    ('Annecy', ['74000'], 2),
+    ('Versailles', ['78000'], 2),
+    ('Serris', ['77700'], 1),
+    ('Boulogne-Billancourt', ['92100'], 3),
+    ('Nanterre', ['92000'], 2),
+    ('Créteil', ['94000'], 2),
+]
+
+
+def generate_offers(count, batch_size, seed, professional_ids, contract_ids):
+    """
+    Insert `count` random offers with batched INSERTs.
+
+    Runs in a worker process when the command is parallelised, so it only
+    takes plain values.
+    """
+    rng = random.Random(seed)
+    city_weights = [weight for _, _, weight in CITIES]
+    OfferContract = Offer.contract.through
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        offers = []
+        contracts = []
+        for _ in range(size):
+            job, low, high = rng.choice(JOBS)
+            level = rng.choice(LEVELS)
+            city, zips, _ = rng.choices(CITIES, weights=city_weights)[0]
+            offers.append(Offer(
+                title=f'{job} {level} (H/F)' if level else f'{job} (H/F)',
+                zip=rng.choice(zips),
+                city=city,
+                salary=rng.randrange(low, high, 500),
+                professional_id=rng.choice(professional_ids),
+            ))
+            contracts.append(rng.sample(contract_ids, rng.choice([1, 1, 1, 2])))
+        with transaction.atomic():
+            offers = Offer.objects.bulk_create(offers)
+            OfferContract.objects.bulk_create([
+                OfferContract(offer_id=offer.id, contracttype_id=contract_id)
+                for offer, offer_contracts in zip(offers, contracts)
+                for contract_id in offer_contracts
+            ])
+        created += size
+    return created
+
+
+def _generate_offers(args):
+    try:
+        return generate_offers(*args)
+    finally:
+        connections.close_all()
+
 
 class Command(BaseCommand):
-    help = 'Creates 1000 Offer objects in the database'
-
-    def handle(self, *args, **kwargs):
-        # Define a function to generate random data for the Offer model
-        def generate_random_string(length=10):
-            return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
-
-        # Create 1000 Offer objects
-        for i in range(5000):
-            offer = Offer.objects.create(
-                title=f"Offer {i + 1}",
-                zip=77700,  # Random description
-                city="Serris",  # Random description
-                salary=random.uniform(10.0, 1000.0),     # Random price between 10 and 1000
-                professional_id=2
+    help = 'Creates random Offer objects in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=5000,
+            help='Number of offers to create.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Offers per INSERT statement.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Random seed, for reproducible datasets.'
+        )
+        parser.add_argument(
+            '--professionals', type=int, default=10,
+            help='Number of professionals owning the offers, created if missing.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes inserting in parallel.'
+        )
+
+    def get_professional_ids(self, count):
+        ids = list(
+            Profile.objects
+            .filter(is_professional=True)
+            .order_by('user_id')
+            .values_list('user_id', flat=True)[:count]
+        )
+        for i in range(len(ids), count):
+            user, _ = User.objects.get_or_create(username=f'generated-pro-{i}')
+            Profile.objects.get_or_create(
+                user=user, defaults={'is_professional': True}
+            )
+            ids.append(user.id)
+        return ids
+
+    def get_contract_ids(self):
+        for name in CONTRACT_TYPES:
+            ContractType.objects.get_or_create(name=name)
+        return list(ContractType.objects.order_by('id').values_list('id', flat=True))
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        count = options['count']
+        workers = max(1, min(options['workers'], count))
+        seed = options['seed']
+        professional_ids = self.get_professional_ids(max(1, options['professionals']))
+        contract_ids = self.get_contract_ids()
+
+        shares = [count // workers + (i < count % workers) for i in range(workers)]
+        jobs = [
+            (
+                share,
+                options['batch_size'],
+                None if seed is None else seed + i,
+                professional_ids,
+                contract_ids,
             )
-            offer.contract.set([1, 2])
-        self.stdout.write(self.style.SUCCESS('Successfully created 1000 Offer objects'))
\ No newline at end of file
+            for i, share in enumerate(shares)
+        ]
+
+        start = time.perf_counter()
+        if workers == 1:
+            created = generate_offers(*jobs[0])
+        else:
+            # Forked workers must not inherit the parent's connection
+            connections.close_all()
+            with multiprocessing.Pool(workers) as pool:
+                created = sum(pool.map(_generate_offers, jobs))
+        elapsed = time.perf_counter() - start
+
+        invalidate_search_results()
+        invalidate_suggestion_index()
+        invalidate_offer_feed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully created {created} Offer objects in {elapsed:.1f}s '
+            f'({created / elapsed:.0f} rows/s)'
+        ))
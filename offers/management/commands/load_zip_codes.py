@@ -0,0 +1,88 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from offers.cache import invalidate_search_results
+from offers.models import ZipCode
+
+
+CODE_COLUMNS = ['code_postal', 'Code_postal', 'zip', 'code']
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads zip code coordinates from a CSV file (e.g. the "Base officielle '
+        'des codes postaux" of data.gouv.fr) and locates the offers using them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, comma or semicolon separated.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def read(self, path):
+        """
+        Average the coordinates of every zip code of the file, as a zip
+        code often covers several communes.
+
+        Coordinates are read from `latitude` and `longitude` columns, or
+        from a `coordonnees_gps` column holding "latitude, longitude".
+        Rows without coordinates are skipped.
+        """
+        points = {}
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            dialect = csv.Sniffer().sniff(f.readline(), delimiters=',;')
+            f.seek(0)
+            reader = csv.DictReader(f, dialect=dialect)
+            columns = reader.fieldnames or []
+            code_column = next((c for c in CODE_COLUMNS if c in columns), None)
+            if code_column is None:
+                raise CommandError(f'No zip code column, expected one of {CODE_COLUMNS}.')
+            for row in reader:
+                try:
+                    if row.get('latitude') and row.get('longitude'):
+                        latitude, longitude = float(row['latitude']), float(row['longitude'])
+                    elif row.get('coordonnees_gps'):
+                        latitude, longitude = map(float, row['coordonnees_gps'].split(','))
+                    else:
+                        continue
+                except ValueError:
+                    continue
+                code = row[code_column].strip().zfill(5)
+                points.setdefault(code, []).append((latitude, longitude))
+        return {
+            code: (
+                sum(latitude for latitude, _ in coordinates) / len(coordinates),
+                sum(longitude for _, longitude in coordinates) / len(coordinates),
+            )
+            for code, coordinates in points.items()
+        }
+
+    def handle(self, *args, **options):
+        coordinates = self.read(options['path'])
+        zip_codes = [
+            ZipCode(code=code, latitude=latitude, longitude=longitude)
+            for code, (latitude, longitude) in coordinates.items()
+        ]
+        with transaction.atomic():
+            ZipCode.objects.bulk_create(
+                zip_codes,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['code'],
+                update_fields=['latitude', 'longitude'],
+            )
+            # Offers written before their zip code was known
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE offers_offersearchdocument document
+                    SET latitude = zip.latitude, longitude = zip.longitude
+                    FROM offers_zipcode zip
+                    WHERE zip.code = document.zip
+                    AND (document.latitude, document.longitude)
+                        IS DISTINCT FROM (zip.latitude, zip.longitude)
+                """)
+                located = cursor.rowcount
+            transaction.on_commit(invalidate_search_results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {len(zip_codes)} zip codes, located {located} offers.'
+        ))
@@ -0,0 +1,119 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:10
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations, models, connection
+
+
+def create_document_triggers(apps, schema_editor):
+    with connection.cursor() as cursor:
+        # Runs after update_offer_search_vector() filled NEW.search_vector
+        cursor.execute("""
+            CREATE FUNCTION update_offer_search_document() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO offers_offersearchdocument
+                    (offer_id, search_vector, title, zip, city, salary, contract_ids)
+                VALUES (
+                    NEW.id, NEW.search_vector, lower(unaccent(NEW.title)),
+                    NEW.zip, NEW.city, NEW.salary,
+                    ARRAY(
+                        SELECT contracttype_id FROM offers_offer_contract
+                        WHERE offer_id = NEW.id ORDER BY contracttype_id
+                    )
+                )
+                ON CONFLICT (offer_id) DO UPDATE SET
+                    search_vector = EXCLUDED.search_vector,
+                    title = EXCLUDED.title,
+                    zip = EXCLUDED.zip,
+                    city = EXCLUDED.city,
+                    salary = EXCLUDED.salary,
+                    contract_ids = EXCLUDED.contract_ids;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("""
+            CREATE TRIGGER offer_search_document_update
+            AFTER INSERT OR UPDATE ON offers_offer
+            FOR EACH ROW EXECUTE FUNCTION update_offer_search_document();
+        """)
+
+        # Statement level, so a bulk insert of contract links updates each
+        # offer's document once
+        cursor.execute("""
+            CREATE FUNCTION update_offer_search_document_contracts() RETURNS trigger AS $$
+            BEGIN
+                UPDATE offers_offersearchdocument document
+                SET contract_ids = ARRAY(
+                    SELECT contracttype_id FROM offers_offer_contract
+                    WHERE offer_id = document.offer_id ORDER BY contracttype_id
+                )
+                WHERE document.offer_id IN (SELECT offer_id FROM changed_contracts);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("""
+            CREATE TRIGGER offer_search_document_contracts_insert
+            AFTER INSERT ON offers_offer_contract
+            REFERENCING NEW TABLE AS changed_contracts
+            FOR EACH STATEMENT EXECUTE FUNCTION update_offer_search_document_contracts();
+        """)
+        cursor.execute("""
+            CREATE TRIGGER offer_search_document_contracts_delete
+            AFTER DELETE ON offers_offer_contract
+            REFERENCING OLD TABLE AS changed_contracts
+            FOR EACH STATEMENT EXECUTE FUNCTION update_offer_search_document_contracts();
+        """)
+
+        cursor.execute("""
+            INSERT INTO offers_offersearchdocument
+                (offer_id, search_vector, title, zip, city, salary, contract_ids)
+            SELECT
+                offer.id, offer.search_vector, lower(unaccent(offer.title)),
+                offer.zip, offer.city, offer.salary,
+                ARRAY(
+                    SELECT contracttype_id FROM offers_offer_contract
+                    WHERE offer_id = offer.id ORDER BY contracttype_id
+                )
+            FROM offers_offer offer;
+        """)
+
+
+def drop_document_triggers(apps, schema_editor):
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TRIGGER IF EXISTS offer_search_document_contracts_delete ON offers_offer_contract;")
+        cursor.execute("DROP TRIGGER IF EXISTS offer_search_document_contracts_insert ON offers_offer_contract;")
+        cursor.execute("DROP FUNCTION IF EXISTS update_offer_search_document_contracts();")
+        cursor.execute("DROP TRIGGER IF EXISTS offer_search_document_update ON offers_offer;")
+        cursor.execute("DROP FUNCTION IF EXISTS update_offer_search_document();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0005_update_search_vector'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.CreateModel(
+            name='OfferSearchDocument',
+            fields=[
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='offers.offer')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('title', models.CharField(max_length=100)),
+                ('zip', models.CharField(max_length=5)),
+                ('city', models.CharField(max_length=100)),
+                ('salary', models.IntegerField()),
+                ('contract_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None)),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='offer_document_vector'), django.contrib.postgres.indexes.GinIndex(fields=['title'], name='offer_document_title_trgm', opclasses=['gin_trgm_ops']), django.contrib.postgres.indexes.GinIndex(fields=['contract_ids'], name='offer_document_contracts')],
+            },
+        ),
+        migrations.RunPython(create_document_triggers, reverse_code=drop_document_triggers),
+    ]
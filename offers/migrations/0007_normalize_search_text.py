@@ -0,0 +1,117 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:12
+
+import offers.models
+from django.db import migrations, models, connection
+
+
+def normalize_search_text(apps, schema_editor):
+    with connection.cursor() as cursor:
+        # unaccent() is only STABLE, as it depends on search_path; pinning
+        # the dictionary makes the wrapper usable in indexes
+        cursor.execute("""
+            CREATE FUNCTION offers_normalize(text) RETURNS text AS $$
+                SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1))
+            $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION update_offer_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('french', offers_normalize(NEW.title)), 'A') ||
+                    setweight(to_tsvector('french', NEW.zip), 'B') ||
+                    setweight(to_tsvector('french', offers_normalize(NEW.city)), 'C');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION update_offer_search_document() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO offers_offersearchdocument
+                    (offer_id, search_vector, title, zip, city, salary, contract_ids)
+                VALUES (
+                    NEW.id, NEW.search_vector, offers_normalize(NEW.title),
+                    NEW.zip, NEW.city, NEW.salary,
+                    ARRAY(
+                        SELECT contracttype_id FROM offers_offer_contract
+                        WHERE offer_id = NEW.id ORDER BY contracttype_id
+                    )
+                )
+                ON CONFLICT (offer_id) DO UPDATE SET
+                    search_vector = EXCLUDED.search_vector,
+                    title = EXCLUDED.title,
+                    zip = EXCLUDED.zip,
+                    city = EXCLUDED.city,
+                    salary = EXCLUDED.salary,
+                    contract_ids = EXCLUDED.contract_ids;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        # Rebuild every vector and document through the triggers
+        cursor.execute("UPDATE offers_offer SET title = title;")
+
+
+def restore_search_text(apps, schema_editor):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION update_offer_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('french', NEW.title), 'A') ||
+                    setweight(to_tsvector('french', NEW.zip), 'B') ||
+                    setweight(to_tsvector('french', NEW.city), 'C');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION update_offer_search_document() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO offers_offersearchdocument
+                    (offer_id, search_vector, title, zip, city, salary, contract_ids)
+                VALUES (
+                    NEW.id, NEW.search_vector, lower(unaccent(NEW.title)),
+                    NEW.zip, NEW.city, NEW.salary,
+                    ARRAY(
+                        SELECT contracttype_id FROM offers_offer_contract
+                        WHERE offer_id = NEW.id ORDER BY contracttype_id
+                    )
+                )
+                ON CONFLICT (offer_id) DO UPDATE SET
+                    search_vector = EXCLUDED.search_vector,
+                    title = EXCLUDED.title,
+                    zip = EXCLUDED.zip,
+                    city = EXCLUDED.city,
+                    salary = EXCLUDED.salary,
+                    contract_ids = EXCLUDED.contract_ids;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("UPDATE offers_offer SET title = title;")
+        cursor.execute("DROP FUNCTION IF EXISTS offers_normalize(text);")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0006_offer_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_search_text, reverse_code=restore_search_text),
+        # Searches read the search document, these only slowed down writes
+        migrations.RemoveIndex(
+            model_name='offer',
+            name='offers_offe_search__f66b18_gin',
+        ),
+        migrations.RemoveIndex(
+            model_name='offer',
+            name='offer_title_trgm',
+        ),
+        migrations.AddIndex(
+            model_name='offersearchdocument',
+            index=models.Index(models.F('zip'), offers.models.Normalize('city'), name='offer_document_zip_city'),
+        ),
+    ]
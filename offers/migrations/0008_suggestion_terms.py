@@ -0,0 +1,99 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:15
+
+from django.db import migrations, models, connection
+
+
+# Adds the `delta` of each title and city in `changes` to the offer count
+# of its term. Terms are upserted in key order so concurrent writers lock
+# them in the same order.
+UPSERT_TERMS = """
+    INSERT INTO offers_suggestionterm (kind, normalized, term, offer_count)
+    SELECT kind, normalized, min(term), sum(delta)
+    FROM (
+        {changes}
+    ) changes
+    GROUP BY kind, normalized
+    HAVING sum(delta) <> 0
+    ORDER BY kind, normalized
+    ON CONFLICT (kind, normalized) DO UPDATE
+    SET offer_count = offers_suggestionterm.offer_count + EXCLUDED.offer_count
+"""
+
+TERMS = """
+        SELECT 'title' AS kind, offers_normalize(title) AS normalized, title AS term, {delta} AS delta FROM {rows}
+        UNION ALL
+        SELECT 'city', offers_normalize(city), city, {delta} FROM {rows}
+"""
+
+
+def create_suggestion_triggers(apps, schema_editor):
+    added = TERMS.format(rows='new_offers', delta=1)
+    removed = TERMS.format(rows='old_offers', delta=-1)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE FUNCTION update_offer_suggestion_terms() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    {UPSERT_TERMS.format(changes=added)};
+                ELSIF TG_OP = 'DELETE' THEN
+                    {UPSERT_TERMS.format(changes=removed)};
+                ELSE
+                    {UPSERT_TERMS.format(changes=added + ' UNION ALL ' + removed)};
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("""
+            CREATE TRIGGER offer_suggestion_terms_insert
+            AFTER INSERT ON offers_offer
+            REFERENCING NEW TABLE AS new_offers
+            FOR EACH STATEMENT EXECUTE FUNCTION update_offer_suggestion_terms();
+        """)
+        cursor.execute("""
+            CREATE TRIGGER offer_suggestion_terms_update
+            AFTER UPDATE ON offers_offer
+            REFERENCING OLD TABLE AS old_offers NEW TABLE AS new_offers
+            FOR EACH STATEMENT EXECUTE FUNCTION update_offer_suggestion_terms();
+        """)
+        cursor.execute("""
+            CREATE TRIGGER offer_suggestion_terms_delete
+            AFTER DELETE ON offers_offer
+            REFERENCING OLD TABLE AS old_offers
+            FOR EACH STATEMENT EXECUTE FUNCTION update_offer_suggestion_terms();
+        """)
+        cursor.execute(UPSERT_TERMS.format(
+            changes=TERMS.format(rows='offers_offer', delta=1)
+        ))
+
+
+def drop_suggestion_triggers(apps, schema_editor):
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TRIGGER IF EXISTS offer_suggestion_terms_delete ON offers_offer;")
+        cursor.execute("DROP TRIGGER IF EXISTS offer_suggestion_terms_update ON offers_offer;")
+        cursor.execute("DROP TRIGGER IF EXISTS offer_suggestion_terms_insert ON offers_offer;")
+        cursor.execute("DROP FUNCTION IF EXISTS update_offer_suggestion_terms();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0007_normalize_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('title', 'Title'), ('city', 'City')], max_length=5)),
+                ('normalized', models.CharField(max_length=100)),
+                ('term', models.CharField(max_length=100)),
+                ('offer_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'normalized'), name='offer_suggestion_term_unique')],
+            },
+        ),
+        migrations.RunPython(create_suggestion_triggers, reverse_code=drop_suggestion_triggers),
+    ]
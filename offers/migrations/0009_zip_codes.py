@@ -0,0 +1,88 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:19
+
+import django.contrib.postgres.indexes
+import offers.models
+from django.contrib.postgres.operations import CreateExtension
+from django.db import migrations, models, connection
+
+
+DOCUMENT_FUNCTION = """
+    CREATE OR REPLACE FUNCTION update_offer_search_document() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO offers_offersearchdocument
+            (offer_id, search_vector, title, zip, city, salary, contract_ids{location_columns})
+        VALUES (
+            NEW.id, NEW.search_vector, offers_normalize(NEW.title),
+            NEW.zip, NEW.city, NEW.salary,
+            ARRAY(
+                SELECT contracttype_id FROM offers_offer_contract
+                WHERE offer_id = NEW.id ORDER BY contracttype_id
+            ){location_values}
+        )
+        ON CONFLICT (offer_id) DO UPDATE SET
+            search_vector = EXCLUDED.search_vector,
+            title = EXCLUDED.title,
+            zip = EXCLUDED.zip,
+            city = EXCLUDED.city,
+            salary = EXCLUDED.salary,
+            contract_ids = EXCLUDED.contract_ids{location_updates};
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def locate_documents(apps, schema_editor):
+    with connection.cursor() as cursor:
+        cursor.execute(DOCUMENT_FUNCTION.format(
+            location_columns=', latitude, longitude',
+            location_values=""",
+            (SELECT latitude FROM offers_zipcode WHERE code = NEW.zip),
+            (SELECT longitude FROM offers_zipcode WHERE code = NEW.zip)""",
+            location_updates=""",
+            latitude = EXCLUDED.latitude,
+            longitude = EXCLUDED.longitude""",
+        ))
+
+
+def unlocate_documents(apps, schema_editor):
+    with connection.cursor() as cursor:
+        cursor.execute(DOCUMENT_FUNCTION.format(
+            location_columns='', location_values='', location_updates=''
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0008_suggestion_terms'),
+    ]
+
+    operations = [
+        CreateExtension('cube'),
+        CreateExtension('earthdistance'),
+        migrations.CreateModel(
+            name='ZipCode',
+            fields=[
+                ('code', models.CharField(max_length=5, primary_key=True, serialize=False)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='offersearchdocument',
+            name='latitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='offersearchdocument',
+            name='longitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='offersearchdocument',
+            index=django.contrib.postgres.indexes.GistIndex(offers.models.LlToEarth('latitude', 'longitude'), name='offer_document_location'),
+        ),
+        # Documents are located when zip codes are loaded (load_zip_codes)
+        migrations.RunPython(locate_documents, reverse_code=unlocate_documents),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0009_zip_codes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offersearchdocument',
+            index=models.Index(fields=['salary', 'offer'], name='offer_document_salary'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0010_offer_document_salary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
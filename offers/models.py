@@ -1,12 +1,83 @@
 
 from django.db import models
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 from django.contrib.postgres.search import (
     SearchQuery, SearchRank, SearchVectorField
 )
 from django.contrib.postgres.search import TrigramSimilarity
-from django.db.models import Q, Value, FloatField
-from django.db.models.functions import Coalesce
+from django.db.models import F, Func, Q, Subquery, Value, FloatField
+from django.db.models.functions import Cast, Coalesce
+from config.metrics import SEARCH_COMPONENTS
+
+
+class Normalize(Func):
+    """
+    lower(unaccent(text)), through the immutable `offers_normalize()` SQL
+    function (migration 0007) that the search triggers and indexes use, so
+    queries are folded exactly like the indexed text.
+    """
+    function = 'offers_normalize'
+    output_field = models.TextField()
+
+
+class LlToEarth(Func):
+    """
+    earthdistance's `ll_to_earth(latitude, longitude)`: a point on the
+    earth's surface, as a 3D cube that GiST indexes.
+    """
+    function = 'll_to_earth'
+    output_field = models.Field()
+
+
+class EarthBox(Func):
+    """
+    earthdistance's `earth_box(point, meters)`: a cube bounding every point
+    within `meters` of `point`, used to select candidates from the index.
+    """
+    function = 'earth_box'
+    output_field = models.Field()
+
+
+class EarthDistance(Func):
+    """
+    earthdistance's `earth_distance(a, b)`: the great circle distance
+    between two points, in meters.
+    """
+    function = 'earth_distance'
+    output_field = FloatField()
+
+
+class CubeDistance(Func):
+    """
+    `cube <-> cube`, the straight-line distance between two points. It
+    orders points like earth_distance() does, and a GiST index can return
+    rows in that order (nearest first) without sorting them.
+    """
+    arg_joiner = ' <-> '
+    template = '(%(expressions)s)'
+    output_field = FloatField()
+
+
+class CubeContains(Func):
+    """
+    `cube @> cube`, indexable when the right side is an indexed expression.
+    """
+    arg_joiner = ' @> '
+    template = '(%(expressions)s)'
+    output_field = models.BooleanField()
+
+
+class ZipCode(models.Model):
+    """
+    Coordinates of a French zip code, loaded by `manage.py load_zip_codes`.
+    """
+    code = models.CharField(max_length=5, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    def __str__(self):
+        return self.code
 
 class ContractType(models.Model):
     name = models.CharField(max_length=20, unique=True)
@@ -22,100 +93,210 @@ class Offer(models.Model):
     contract = models.ManyToManyField(ContractType)
     professional = models.ForeignKey('auth.User', on_delete=models.CASCADE)
     search_vector = SearchVectorField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped when the contracts change (see offers/signals.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Orders accepted by search_offers()
+    SORTS = ('relevance', 'salary', '-salary')
 
     def __str__(self):
         return self.title
 
-    class Meta:
-        indexes = [
-            GinIndex(fields=['search_vector']),
-            GinIndex(
-                name="offer_title_trgm", 
-                opclasses=["gin_trgm_ops"], 
-                fields=["title"]
-            ),
-        ]
-
     @classmethod
-    def search_offers(cls, title, zip_code, city_str, contract_ids=[]):
+    def search_offers(
+        cls, title, zip_code, city_str, contract_ids=[], near='', radius=None,
+        salary_min=None, salary_max=None, sort='relevance'
+    ):
+        """
+        Search offers by title, zip code, city, contract types, distance and
+        salary.
+
+        Terms are folded with Normalize() and parsed with the French
+        configuration, exactly as the indexed text, so accents and case
+        never push a search from the full-text path to the trigram one.
+
+        Every predicate is resolved on the offer's OfferSearchDocument,
+        joined one to one, so no DISTINCT is needed. The full-text
+        predicate and the trigram predicate are OR'd in a single scan so
+        the planner can combine both GIN indexes, and the rank and
+        similarity are computed once as annotations. Contracts match when
+        the document's contract id array overlaps the requested ones.
+
+        With `near` (a zip code) and `radius` (km), only offers located
+        within `radius` of the zip code are kept, closest first among
+        equally ranked ones. The zip code bounding box is matched against
+        the GiST index of document locations and the exact distance is
+        only computed for the candidates it returns; without text terms
+        the index also returns them nearest first, so a page does not sort
+        every offer of the area.
+
+        `salary_min` and `salary_max` bound the salary (inclusive). Offers
+        are ordered by relevance, or by salary with `sort='salary'` or
+        `'-salary'`; both the range and the salary order are read from the
+        document's (salary, offer_id) index, so a salary sorted page stops
+        after its rows instead of sorting every match. The returned
+        queryset is lazy and evaluates in one SQL statement.
+        """
         search_query = None
-        if title:
-            search_query = SearchQuery(title)
-        if zip_code:
-            search_query = (
-                search_query & SearchQuery(zip_code) 
-                if search_query else SearchQuery(zip_code)
-            )
-        if city_str:
-            search_query = (
-                search_query & SearchQuery(city_str) 
-                if search_query else SearchQuery(city_str)
-            )
+        for term in (title, zip_code, city_str):
+            if term:
+                term_query = SearchQuery(Normalize(Value(term)), config='french')
+                search_query = (
+                    search_query & term_query if search_query else term_query
+                )
+
+        salary_range = salary_min is not None or salary_max is not None
+        if not search_query and not contract_ids and not near and not salary_range:
+            return cls.objects.none()
+
+        normalized_title = Normalize(Value(title))
+        # Cast to double precision so the values read back by Python compare
+        # exactly equal in SQL (keyset pagination seeks on them)
+        offers = cls.objects.annotate(
+            rank=Cast(Coalesce(
+                SearchRank(F('search_document__search_vector'), search_query),
+                Value(0.0)
+            ), FloatField()) if search_query else Value(0.0, output_field=FloatField()),
+            similarity=Cast(Coalesce(
+                TrigramSimilarity('search_document__title', normalized_title),
+                Value(0.0)
+            ), FloatField()) if title else Value(0.0, output_field=FloatField()),
+        )
 
-        only_contract_ids = not title and not zip_code and not city_str
-    
-        # Perform Full-Text Search (FTS) if a query exists
         if search_query:
-            fts_offers = (
-                Offer.objects
-                .annotate(
-                    rank=SearchRank('search_vector', search_query)
+            SEARCH_COMPONENTS.labels('fts').inc()
+            text_filter = Q(search_document__search_vector=search_query)
+            if title:
+                SEARCH_COMPONENTS.labels('trigram').inc()
+                # `%` lets the trigram GIN index drive the scan, the strict
+                # threshold keeps the historical `similarity > 0.3` semantics
+                trigram_filter = Q(
+                    search_document__title__trigram_similar=normalized_title,
+                    similarity__gt=0.3
                 )
-                .filter(search_vector=search_query)
-            )
-        else:
-            fts_offers = Offer.objects.none()
-        # Perform Trigram Search only if `title` is provided
-        if title:
-            trigram_offers = (
-                Offer.objects
-                .annotate(similarity=TrigramSimilarity('title', title))
-                .filter(similarity__gt=0.3)  # Increase threshold for better accuracy
+                if zip_code and city_str:
+                    offers = offers.alias(
+                        document_city=Normalize('search_document__city')
+                    )
+                    trigram_filter &= Q(
+                        search_document__zip=zip_code,
+                        document_city=Normalize(Value(city_str))
+                    )
+                text_filter |= trigram_filter
+            offers = offers.filter(text_filter)
+
+        if contract_ids:
+            SEARCH_COMPONENTS.labels('contract').inc()
+            offers = offers.filter(
+                search_document__contract_ids__overlap=[int(pk) for pk in contract_ids]
             )
-            if zip_code and trigram_offers.exists() and city_str:
-                trigram_offers = trigram_offers.filter(
-                    zip=zip_code,
-                    city=city_str
-                )
-        else:
-            trigram_offers = Offer.objects.none()
 
+        if salary_range:
+            SEARCH_COMPONENTS.labels('salary').inc()
+            if salary_min is not None:
+                offers = offers.filter(search_document__salary__gte=salary_min)
+            if salary_max is not None:
+                offers = offers.filter(search_document__salary__lte=salary_max)
 
-        # Combine both querysets using Q objects
-        combined_offers = (
-            Offer.objects
-            .filter(
-                Q(id__in=fts_offers.values('id')) |
-                Q(id__in=trigram_offers.values('id'))
+        if sort == 'salary':
+            ordering = ['document_salary', 'id']
+        elif sort == '-salary':
+            ordering = ['-document_salary', '-id']
+        else:
+            ordering = ['-rank', '-similarity', 'id']
+        if sort != 'relevance':
+            offers = offers.annotate(document_salary=F('search_document__salary'))
+
+        if near:
+            SEARCH_COMPONENTS.labels('radius').inc()
+            zip_codes = ZipCode.objects.filter(code=near)
+            center = LlToEarth(
+                Subquery(zip_codes.values('latitude')),
+                Subquery(zip_codes.values('longitude')),
             )
-            .annotate(
-                # Explicitly set output_field for rank and similarity
-                rank=Coalesce(
-                    SearchRank(
-                        'search_vector', search_query), 
-                        Value(0.0), output_field=FloatField()) 
-                        if search_query else Value(0.0, 
-                        output_field=FloatField()
-                    ),
-                similarity=Coalesce(
-                    TrigramSimilarity('title', title), 
-                    Value(0.0), output_field=FloatField()) 
-                    if title else Value(0.0, 
-                    output_field=FloatField()
-                )
+            location = LlToEarth(
+                'search_document__latitude', 'search_document__longitude'
             )
-            .order_by('-rank', '-similarity')
-            .distinct()
-        )
+            meters = radius * 1000
+            offers = offers.annotate(
+                distance=EarthDistance(center, location),
+                proximity=CubeDistance(location, center),
+            ).filter(
+                CubeContains(EarthBox(center, Value(meters)), location),
+                distance__lte=meters,
+            )
+            # Nearest first among offers of equal relevance or salary
+            ordering.insert(-1, 'proximity')
+        return offers.order_by(*ordering)
+
+
+class OfferSearchDocument(models.Model):
+    """
+    Denormalized search data of an offer, one row per offer.
+
+    Rows are written by database triggers (see migration 0006) in the
+    transaction that changes the offer or its contracts; the application
+    never writes them.
+    """
+    offer = models.OneToOneField(
+        Offer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    search_vector = SearchVectorField(null=True)
+    # offers_normalize(title)
+    title = models.CharField(max_length=100)
+    zip = models.CharField(max_length=5)
+    city = models.CharField(max_length=100)
+    salary = models.IntegerField()
+    contract_ids = ArrayField(models.BigIntegerField(), default=list)
+    # Coordinates of the zip code, when it is in the ZipCode table
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
 
-        # Filter by contract IDs if provided
-        if contract_ids and combined_offers.exists():
-            combined_offers = combined_offers.filter(
-                contract__id__in=contract_ids
-            ).distinct()
-        elif contract_ids and only_contract_ids:
-            combined_offers = cls.objects.filter(
-                contract__id__in=contract_ids
-            ).distinct()
-        return combined_offers
-    
\ No newline at end of file
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='offer_document_vector'),
+            GinIndex(
+                name='offer_document_title_trgm',
+                opclasses=['gin_trgm_ops'],
+                fields=['title']
+            ),
+            GinIndex(fields=['contract_ids'], name='offer_document_contracts'),
+            models.Index(
+                F('zip'), Normalize('city'), name='offer_document_zip_city'
+            ),
+            GistIndex(
+                LlToEarth('latitude', 'longitude'), name='offer_document_location'
+            ),
+            models.Index(
+                fields=['salary', 'offer'], name='offer_document_salary'
+            ),
+        ]
+
+
+class SuggestionTerm(models.Model):
+    """
+    A distinct offer title or city and the number of offers using it.
+
+    Rows are maintained by statement-level triggers on offers_offer
+    (see migration 0008) and feed the in-memory suggestion index.
+    """
+    TITLE = 'title'
+    CITY = 'city'
+    KIND_CHOICES = [(TITLE, 'Title'), (CITY, 'City')]
+
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    # offers_normalize(term)
+    normalized = models.CharField(max_length=100)
+    term = models.CharField(max_length=100)
+    offer_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'normalized'], name='offer_suggestion_term_unique'
+            ),
+        ]
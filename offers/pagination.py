@@ -0,0 +1,242 @@
+import base64
+import binascii
+import bisect
+import json
+import math
+
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, reverse=False):
+    """
+    Encode the ordering values of a boundary row into an opaque token.
+    """
+    payload = json.dumps({'v': list(values), 'r': reverse}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Decode a token produced by `encode_cursor`.
+
+    Raises:
+        InvalidCursor: If the token is malformed or does not carry one
+        value per ordering field.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, reverse = payload['v'], payload['r']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor.')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor.')
+    return values, bool(reverse)
+
+
+def valid_cursor_value(field, value):
+    """
+    Tell whether a decoded cursor value fits the ordering `field`: the
+    orderings are numeric (rank, similarity, proximity, salary), ending
+    with the integer `id`.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    if field.lstrip('-') == 'id':
+        return isinstance(value, int)
+    return math.isfinite(value)
+
+
+class CursorPage(list):
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        super().__init__(object_list)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+
+class CursorPaginator:
+    """
+    Keyset paginator seeking on the ordering of an ordered queryset.
+
+    Instead of counting the result set and skipping rows with OFFSET,
+    each page is fetched with a `WHERE (ordering) > (boundary)` predicate
+    built from the last (or first) row of the previous page, so every
+    page costs the same regardless of its depth. The last ordering field
+    must be unique (e.g. `id`) for the ordering to be total.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(queryset.query.order_by)
+        if not self.ordering:
+            raise ValueError('CursorPaginator requires an ordered queryset.')
+
+    def _value(self, obj, field):
+        # Rows are model instances, or dicts for a values() queryset
+        if isinstance(obj, dict):
+            return obj[field.lstrip('-')]
+        return getattr(obj, field.lstrip('-'))
+
+    def _cursor(self, obj, reverse):
+        return encode_cursor(
+            [self._value(obj, field) for field in self.ordering], reverse
+        )
+
+    def _seek(self, values, reverse):
+        """
+        Build the predicate selecting rows strictly after `values` in the
+        queryset ordering, or strictly before them when `reverse` is set.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _flip(self, field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def page(self, cursor=None):
+        """
+        Return the page following (or preceding) the given cursor.
+
+        An empty or missing cursor returns the first page.
+        """
+        queryset = self.queryset
+        reverse = False
+        if cursor:
+            values, reverse = decode_cursor(cursor, len(self.ordering))
+            if not all(map(valid_cursor_value, self.ordering, values)):
+                raise InvalidCursor('Invalid cursor.')
+            queryset = queryset.filter(self._seek(values, reverse))
+        if reverse:
+            queryset = queryset.order_by(*[self._flip(f) for f in self.ordering])
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows, None, None)
+        has_next = has_more if not reverse else True
+        has_previous = bool(cursor) if not reverse else has_more
+        return CursorPage(
+            rows,
+            self._cursor(rows[-1], False) if has_next else None,
+            self._cursor(rows[0], True) if has_previous else None,
+        )
+
+
+class FeedPaginator:
+    """
+    Keyset paginator over a newest-first list of cached offer ids.
+
+    Pages are located in the ids by bisection and only their own rows
+    are loaded, by primary key. Cursors are those of a CursorPaginator
+    ordered by `-id`, which serves the pages reaching past the end of a
+    truncated list.
+    """
+
+    def __init__(self, ids, complete, queryset, per_page):
+        self.ids = ids
+        self.complete = complete
+        self.queryset = queryset.order_by('-id')
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """
+        Return the page following (or preceding) the given cursor.
+
+        An empty or missing cursor returns the first page.
+        """
+        reverse = False
+        if cursor:
+            (pk,), reverse = decode_cursor(cursor, 1)
+            if not valid_cursor_value('id', pk):
+                raise InvalidCursor('Invalid cursor.')
+        start = 0
+        if not cursor:
+            page_ids = self.ids[:self.per_page + 1]
+        elif reverse:
+            # Ids are descending: those before the cursor are the higher ones
+            end = bisect.bisect_left(self.ids, -pk, key=lambda id: -id)
+            page_ids = self.ids[max(end - self.per_page - 1, 0):end]
+        else:
+            start = bisect.bisect_right(self.ids, -pk, key=lambda id: -id)
+            page_ids = self.ids[start:start + self.per_page + 1]
+        # Ids missing from a truncated list are read from the table
+        beyond = (
+            end == len(self.ids) if reverse else len(page_ids) <= self.per_page
+        )
+        if beyond and not self.complete:
+            return CursorPaginator(self.queryset, self.per_page).page(cursor)
+
+        if not page_ids:
+            return CursorPage([], None, None)
+        has_more = len(page_ids) > self.per_page
+        page_ids = page_ids[-self.per_page:] if reverse else page_ids[:self.per_page]
+        rows = list(self.queryset.filter(pk__in=page_ids))
+        has_next = has_more if not reverse else True
+        # Going forward, newer offers precede the page if any id is higher
+        has_previous = start > 0 if not reverse else has_more
+        return CursorPage(
+            rows,
+            encode_cursor([page_ids[-1]], False) if has_next else None,
+            encode_cursor([page_ids[0]], True) if has_previous else None,
+        )
+
+
+class CountFreePage(list):
+    def __init__(self, object_list, number, has_next):
+        super().__init__(object_list)
+        self.number = number
+        self.has_next = has_next
+
+
+class CountFreePaginator:
+    """
+    Page number paginator that never counts the result set.
+
+    A page fetches one row more than its size to tell whether another
+    page follows. Page numbers that are not positive integers give the
+    first page and pages past the end are empty, as the last page is
+    unknown.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        start = (number - 1) * self.per_page
+        rows = list(self.queryset[start:start + self.per_page + 1])
+        return CountFreePage(
+            rows[:self.per_page], number, len(rows) > self.per_page
+        )
+
+
+def estimate_count(queryset):
+    """
+    Return the number of rows PostgreSQL's planner expects `queryset` to
+    return, from table statistics and without running it.
+    """
+    # An empty queryset (e.g. a blank search) has no plan to explain
+    if queryset.query.is_empty():
+        return 0
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
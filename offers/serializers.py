@@ -1,7 +1,35 @@
+import json
+from functools import partial
+
 from rest_framework import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+from .cache import (
+    get_contract_type_catalogue,
+    invalidate_search_results,
+    invalidate_suggestion_index,
+    update_offer_feed,
+)
 from .models import Offer, ContractType
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# Columns of an offer read by offer_dict()
+OFFER_READ_FIELDS = [
+    'id', 'title', 'zip', 'city', 'salary', 'search_vector', 'created_at',
+    'updated_at', 'search_document__contract_ids',
+]
+
+# Formats timestamps exactly as OfferSerializer does
+_datetime_field = serializers.DateTimeField()
+
 
 class ContractTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,11 +37,74 @@ class ContractTypeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class OfferSerializer(serializers.ModelSerializer):
-    contract = ContractTypeSerializer(many=True, read_only=True)
+    contract = serializers.SerializerMethodField()
     class Meta:
         model = Offer
         exclude = ['professional']
 
+    @cached_property
+    def contract_types(self):
+        # The child serializer is shared by every row of a list, so the
+        # catalogue is looked up once per response. Async views pass it in
+        # the context as it may query the database.
+        if 'contract_types' in self.context:
+            return self.context['contract_types']
+        return get_contract_type_catalogue().by_id
+
+    def get_contract(self, obj):
+        return [
+            self.contract_types.get(contract.id)
+            or ContractTypeSerializer(contract).data
+            for contract in obj.contract.all()
+        ]
+
+def offer_values(queryset):
+    """
+    Narrow an offer queryset to the columns of offer_dict(), plus the
+    annotations it is ordered by so cursors can be built from the rows.
+    """
+    ordering = [field.lstrip('-') for field in queryset.query.order_by]
+    extra = [name for name in ordering if name not in OFFER_READ_FIELDS]
+    return queryset.values(*OFFER_READ_FIELDS, *extra)
+
+
+def offer_dict(row, contract_names):
+    """
+    Build the representation OfferSerializer gives of an offer from a row
+    of offer_values(), without instantiating the model or its contracts.
+
+    Contracts are read from the search document's contract id array and
+    named from the contract type catalogue, so no join on the contract
+    table is needed.
+    """
+    return {
+        'id': row['id'],
+        'contract': [
+            {'id': pk, 'name': contract_names.get(pk)}
+            for pk in row['search_document__contract_ids'] or []
+        ],
+        'title': row['title'],
+        'zip': row['zip'],
+        'city': row['city'],
+        'salary': row['salary'],
+        'search_vector': row['search_vector'],
+        'created_at': _datetime_field.to_representation(row['created_at']),
+        'updated_at': _datetime_field.to_representation(row['updated_at']),
+    }
+
+
+def json_response(data, status=200):
+    """
+    Encode `data` with orjson when it is installed, the standard library
+    otherwise.
+    """
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, cls=DjangoJSONEncoder)
+    return HttpResponse(content, content_type='application/json', status=status)
+
+
 class OfferActionSerializer(serializers.ModelSerializer):
     contract = serializers.PrimaryKeyRelatedField(
         many=True, queryset=ContractType.objects.all()
@@ -26,7 +117,7 @@ class OfferActionSerializer(serializers.ModelSerializer):
         contract_data = validated_data.pop('contract', [])
         if not contract_data:
             raise serializers.ValidationError({'contract': 'This field cant be null.'})
-        validated_data['professional'] = self.context['request'].user
+        validated_data['professional_id'] = self.context['request'].user.id
         offer = Offer.objects.create(**validated_data)
         offer.contract.set(contract_data)
         return offer
@@ -41,4 +132,72 @@ class OfferActionSerializer(serializers.ModelSerializer):
         instance.save()
         if contract_data is not None:
             instance.contract.set(contract_data)
-        return instance
\ No newline at end of file
+        return instance
+
+class OfferBulkSerializer(serializers.ModelSerializer):
+    """
+    Validate one row of a bulk offer import.
+
+    Contract ids are checked against the cached contract type catalogue
+    passed in the `contract_types` context, so validating thousands of
+    rows does not query the database once per contract.
+    """
+    contract = serializers.ListField(child=serializers.IntegerField())
+    class Meta:
+        model = Offer
+        fields = ['title', 'zip', 'city', 'salary', 'contract']
+
+    def validate_contract(self, value):
+        if not value:
+            raise serializers.ValidationError('This field cant be null.')
+        for pk in value:
+            if pk not in self.context['contract_types']:
+                raise serializers.ValidationError(
+                    f'Invalid pk "{pk}" - object does not exist.'
+                )
+        return list(dict.fromkeys(value))
+
+
+def bulk_create_offers(professional, rows, batch_size):
+    """
+    Insert validated offer rows and link their contracts.
+
+    Offers are inserted with batched multi-row INSERTs, which still fire
+    the `search_vector` trigger for every row, then all contract links go
+    into the `Offer.contract` through table in the same way. Both happen in
+    a single transaction.
+
+    Args:
+        professional (User): Owner of the new offers, a User or a TokenUser.
+        rows (list): `validated_data` of OfferBulkSerializer rows.
+        batch_size (int): Rows per INSERT statement.
+
+    Returns:
+        list: The created offers.
+    """
+    OfferContract = Offer.contract.through
+    with transaction.atomic():
+        offers = Offer.objects.bulk_create(
+            [
+                Offer(
+                    professional_id=professional.id,
+                    **{k: v for k, v in row.items() if k != 'contract'}
+                )
+                for row in rows
+            ],
+            batch_size=batch_size,
+        )
+        OfferContract.objects.bulk_create(
+            [
+                OfferContract(offer_id=offer.id, contracttype_id=contract_id)
+                for offer, row in zip(offers, rows)
+                for contract_id in row['contract']
+            ],
+            batch_size=batch_size,
+        )
+        transaction.on_commit(invalidate_search_results)
+        transaction.on_commit(invalidate_suggestion_index)
+        transaction.on_commit(
+            partial(update_offer_feed, created=[offer.id for offer in offers])
+        )
+    return offers
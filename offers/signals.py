@@ -0,0 +1,69 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (
+    invalidate_contract_type_catalogue,
+    invalidate_search_results,
+    invalidate_suggestion_index,
+    update_offer_feed,
+)
+from .models import ContractType, Offer
+
+
+@receiver([post_save, post_delete], sender=ContractType)
+def contract_type_changed(sender, **kwargs):
+    # Wait for the commit so no process can cache the old rows under the
+    # new version
+    transaction.on_commit(invalidate_contract_type_catalogue)
+    transaction.on_commit(invalidate_search_results)
+
+
+def _suggested_terms(offer):
+    # Read from __dict__ so deferred fields are not loaded
+    return (offer.__dict__.get('title'), offer.__dict__.get('city'))
+
+
+@receiver(post_init, sender=Offer)
+def offer_loaded(sender, instance, **kwargs):
+    instance._loaded_terms = _suggested_terms(instance)
+
+
+@receiver([post_save, post_delete], sender=Offer)
+def offer_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_search_results)
+    deleted = kwargs['signal'] is post_delete
+    # Suggestions only depend on titles, cities and how many offers use them
+    loaded = instance._loaded_terms
+    instance._loaded_terms = _suggested_terms(instance)
+    if deleted or kwargs['created'] or loaded != instance._loaded_terms:
+        transaction.on_commit(invalidate_suggestion_index)
+    # Edits keep their place in the feed, whose rows are read at request time
+    if kwargs.get('created'):
+        transaction.on_commit(partial(update_offer_feed, created=[instance.pk]))
+    elif deleted:
+        transaction.on_commit(partial(update_offer_feed, deleted=[instance.pk]))
+
+
+@receiver(m2m_changed, sender=Offer.contract.through)
+def offer_contracts_changed(sender, action, instance, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # post_clear gets no pk_set, the offers are collected beforehand
+        instance._cleared_offer_ids = set(
+            instance.offer_set.values_list('id', flat=True)
+        )
+    if action == 'post_clear' and reverse:
+        pk_set = instance.__dict__.pop('_cleared_offer_ids', None)
+    if action.startswith('post_'):
+        # Contracts are part of the offer representation, so they change
+        # its ETag and Last-Modified
+        now = timezone.now()
+        if not reverse:
+            instance.updated_at = now
+            Offer.objects.filter(pk=instance.pk).update(updated_at=now)
+        elif pk_set:
+            Offer.objects.filter(pk__in=pk_set).update(updated_at=now)
+        transaction.on_commit(invalidate_search_results)
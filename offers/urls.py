@@ -1,11 +1,33 @@
+from django.conf import settings
 from django.urls import path
-from .views import OfferView, get_all_contract_type
+from .views import (
+    OfferView,
+    OfferBulkView,
+    export_offers,
+    get_all_contract_type,
+    get_search_cache_stats,
+    get_suggestions,
+)
+
+offer_view = OfferView.as_view()
+offer_list_view = offer_detail_view = offer_view
+contract_type_view = get_all_contract_type
+
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import contract_types, offer_detail, offer_list, read_view
+    offer_list_view = read_view(offer_list, offer_view)
+    offer_detail_view = read_view(offer_detail, offer_view)
+    contract_type_view = read_view(contract_types, get_all_contract_type)
 
 urlpatterns = [
-    path('create/', OfferView.as_view(), name='offer-create'),
-    path('<int:pk>/', OfferView.as_view(), name='offer-detail'),
-    path('<int:pk>/', OfferView.as_view(), name='offer-update'),
-    path('', OfferView.as_view(), name='offer-list'),
-    path('<int:pk>/delete/', OfferView.as_view(), name='offer-delete'),
-    path('get-all-contract-type/', get_all_contract_type, name='get-all-contract-type'),
-]
\ No newline at end of file
+    path('create/', offer_view, name='offer-create'),
+    path('bulk/', OfferBulkView.as_view(), name='offer-bulk-create'),
+    path('export.<str:export_format>', export_offers, name='offer-export'),
+    path('<int:pk>/', offer_detail_view, name='offer-detail'),
+    path('<int:pk>/', offer_detail_view, name='offer-update'),
+    path('', offer_list_view, name='offer-list'),
+    path('<int:pk>/delete/', offer_view, name='offer-delete'),
+    path('get-all-contract-type/', contract_type_view, name='get-all-contract-type'),
+    path('suggestions/', get_suggestions, name='offer-suggestions'),
+    path('search-cache-stats/', get_search_cache_stats, name='search-cache-stats'),
+]
@@ -1,20 +1,334 @@
+import hashlib
 import json            
+import math
 
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.exceptions import NotFound
-from django.contrib.auth.models import User
-from django.http import JsonResponse
-from rest_framework.decorators import api_view
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.exceptions import NotFound, ValidationError
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
-from .serializers import OfferSerializer, ContractTypeSerializer, OfferActionSerializer
-from .models import Offer, ContractType
+from rest_framework.parsers import JSONParser
+from .serializers import (
+    ContractTypeSerializer,
+    OfferActionSerializer,
+    OfferBulkSerializer,
+    bulk_create_offers,
+    json_response,
+    offer_dict,
+    offer_values,
+)
+from .parsers import NDJSONParser
+from .cache import (
+    cached_facets,
+    cached_search,
+    get_contract_type_catalogue,
+    get_offer_feed,
+    get_suggestion_index,
+    normalize_search_terms,
+    normalize_text,
+    search_cache_stats,
+)
+from .export import EXPORT_FORMATS, export_lines, offer_rows
+from .facets import FACETS, compute_facets
+from .models import Offer, ContractType, SuggestionTerm
+from .pagination import (
+    CountFreePaginator,
+    CursorPaginator,
+    FeedPaginator,
+    InvalidCursor,
+    estimate_count,
+)
 from config.permissions import IsOwner, IsProfessional
 
 
+def search_radius(value):
+    """
+    Parse the `radius` query parameter, in km.
+
+    Raises:
+        ValidationError: If it is not a number between 0 (excluded) and
+        SEARCH_RADIUS_MAX_KM.
+    """
+    if value is None:
+        return settings.SEARCH_RADIUS_DEFAULT_KM
+    try:
+        radius = float(value)
+    except ValueError:
+        raise ValidationError({'radius': 'Must be a number.'})
+    if not 0 < radius <= settings.SEARCH_RADIUS_MAX_KM:
+        raise ValidationError(
+            {'radius': f'Must be between 0 and {settings.SEARCH_RADIUS_MAX_KM} km.'}
+        )
+    return radius
+
+
+def search_salary(params, name):
+    """
+    Parse a salary bound of the query string, None when absent.
+
+    Raises:
+        ValidationError: If it is not a non-negative integer.
+    """
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        salary = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
+    if salary < 0:
+        raise ValidationError({name: 'Must be positive.'})
+    return salary
+
+
+def search_contracts(values):
+    """
+    Parse the `contract` query parameters, contract type ids.
+
+    Raises:
+        ValidationError: If one is not an integer.
+    """
+    try:
+        return [int(value) for value in values]
+    except ValueError:
+        raise ValidationError({'contract': 'Must be contract type ids.'})
+
+
+def search_facets(value):
+    """
+    Parse the comma separated `facets` query parameter.
+
+    Raises:
+        ValidationError: If it names an unknown facet.
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    unknown = set(names) - set(FACETS)
+    if unknown:
+        raise ValidationError(
+            {'facets': f'Unknown facets {", ".join(sorted(unknown))}, expected {", ".join(FACETS)}.'}
+        )
+    return list(dict.fromkeys(names))
+
+
+# How page mode reports the size of the result set
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+def search_page_size(value):
+    """
+    Parse the `page_size` query parameter.
+
+    Raises:
+        ValidationError: If it is not an integer between 1 and
+        OFFER_MAX_PAGE_SIZE.
+    """
+    if value in (None, ''):
+        return settings.OFFER_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise ValidationError({'page_size': 'Must be an integer.'})
+    if not 1 <= page_size <= settings.OFFER_MAX_PAGE_SIZE:
+        raise ValidationError(
+            {'page_size': f'Must be between 1 and {settings.OFFER_MAX_PAGE_SIZE}.'}
+        )
+    return page_size
+
+
+def list_offers(params, user):
+    """
+    Build a page of offers for the list endpoint.
+
+    Shared by OfferView and the async read views so both deployments
+    answer the same way. See OfferView.get for the parameters.
+
+    Args:
+        params (QueryDict): The query string of the request.
+        user (User): The requesting user, possibly anonymous or a TokenUser.
+
+    Returns:
+        dict: The offers, as rows of `offer_values` to be serialized by
+        `offer_list_response`, with `total_pages` (page mode),
+        `page`/`has_next` and possibly `estimated_count`/`total_pages`
+        (page mode without exact count), or `next`/`previous` cursors
+        (cursor mode and the anonymous feed), and the requested `facets`.
+
+    Raises:
+        ValidationError: If the cursor, the contract ids, the radius, the
+        salary range, the sort, the facets, the page size or the count
+        mode are invalid, or if facets are requested from the feed.
+    """
+    title = params.get("title" ,"")
+    zip_code = params.get("zip", "")
+    city = params.get("city", "")
+    contract_ids = search_contracts(params.getlist('contract'))
+    near = params.get('near', '')
+    radius = search_radius(params.get('radius'))
+    salary_min = search_salary(params, 'salary_min')
+    salary_max = search_salary(params, 'salary_max')
+    if salary_min is not None and salary_max is not None and salary_min > salary_max:
+        raise ValidationError({'salary_max': 'Must not be lower than salary_min.'})
+    sort = params.get('sort') or 'relevance'
+    if sort not in Offer.SORTS:
+        raise ValidationError({'sort': f'Must be one of {", ".join(Offer.SORTS)}.'})
+    facet_names = search_facets(params.get('facets'))
+    page_size = search_page_size(params.get('page_size'))
+    count_mode = params.get('count') or 'exact'
+    if count_mode not in COUNT_MODES:
+        raise ValidationError({'count': f'Must be one of {", ".join(COUNT_MODES)}.'})
+    page_number = params.get('page')
+    cursor = params.get('cursor')
+    search_terms = None
+    salary_range = salary_min is not None or salary_max is not None
+    if title or zip_code or city or contract_ids or near or salary_range:
+        search_terms = normalize_search_terms(
+            title,
+            zip_code,
+            city,
+            contract_ids,
+            near,
+            radius,
+            salary_min,
+            salary_max,
+            sort
+        )
+        offers = Offer.search_offers(*search_terms)
+    elif user.is_authenticated:
+        offers = Offer.objects.filter(
+            professional_id=user.id
+        ).order_by('id')
+    else:
+        # Public feed, newest first, never counted nor scanned
+        if facet_names:
+            raise ValidationError({'facets': 'Requires search filters.'})
+        feed = get_offer_feed()
+        paginator = FeedPaginator(
+            feed['ids'], feed['complete'], offer_values(Offer.objects.all()), page_size
+        )
+        try:
+            page = paginator.page(cursor)
+        except InvalidCursor as e:
+            raise ValidationError({'cursor': str(e)})
+        return {
+            'offers': list(page),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+    facets = {}
+    if facet_names and search_terms:
+        facets = {'facets': cached_facets(search_terms, offers, facet_names)}
+    elif facet_names:
+        facets = {'facets': compute_facets(
+            offers, facet_names, get_contract_type_catalogue().names
+        )}
+    # Read the needed columns as dicts rather than model instances
+    offers = offer_values(offers)
+    if cursor is not None:
+        try:
+            page = CursorPaginator(offers, page_size).page(cursor)
+        except InvalidCursor as e:
+            raise ValidationError({'cursor': str(e)})
+        return {
+            'offers': list(page),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+            **facets,
+        }
+    if count_mode != 'exact':
+        page = CountFreePaginator(offers, page_size).page(page_number)
+        data = {
+            'offers': list(page),
+            'page': page.number,
+            'has_next': page.has_next,
+            **facets,
+        }
+        if count_mode == 'estimate':
+            # Planner estimates are coarse for small result sets, which
+            # are cheap to count
+            total = estimate_count(offers)
+            if total <= settings.OFFER_COUNT_ESTIMATE_THRESHOLD:
+                total = offers.count()
+            data['estimated_count'] = total
+            data['total_pages'] = max(math.ceil(total / page_size), 1)
+        return data
+    if search_terms:
+        offers = cached_search(search_terms, offers)
+    # Pagination: Limit the number of results per page
+    paginator = Paginator(offers, page_size)
+    try:
+        page_obj = paginator.page(page_number)
+    except PageNotAnInteger:
+        page_obj = paginator.page(1)
+    except EmptyPage:
+        page_obj = paginator.page(paginator.num_pages)
+
+    return {
+        'offers': list(page_obj),
+        'total_pages': paginator.num_pages,
+        **facets,
+    }
+
+
+def offer_response(request, offer, catalogue):
+    """
+    Answer with one offer (a row of `offer_values`), or with a 304 when
+    the client's copy is current, along with its ETag and Last-Modified
+    headers.
+
+    The strong ETag is derived from the offer id, its `updated_at` and
+    the contract type catalogue its contracts are named from.
+    """
+    digest = hashlib.sha1(
+        f"{offer['id']}:{offer['updated_at'].isoformat()}:{catalogue.etag}".encode()
+    ).hexdigest()
+    etag = quote_etag(digest)
+    last_modified = int(offer['updated_at'].timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = json_response(offer_dict(offer, catalogue.names))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def offer_list_response(request, data, catalogue):
+    """
+    Answer with a page built by `list_offers`, or with a 304 when the
+    client's copy is current, along with its ETag header.
+
+    The weak ETag is derived from the ids of the page, their latest
+    `updated_at`, the contract type catalogue and the rest of the page
+    (counts, cursors, facets). It changes when an offer of the page is
+    edited or leaves it; pages have no Last-Modified date, as removed
+    offers would not move it.
+    """
+    rows = data['offers']
+    latest = max((row['updated_at'] for row in rows), default=None)
+    digest = hashlib.sha1(json.dumps([
+        [row['id'] for row in rows],
+        latest.isoformat() if latest else None,
+        catalogue.etag,
+        {key: value for key, value in data.items() if key != 'offers'},
+    ], sort_keys=True).encode()).hexdigest()
+    etag = 'W/' + quote_etag(digest)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = json_response({
+            **data, 'offers': [offer_dict(row, catalogue.names) for row in rows]
+        })
+    response['ETag'] = etag
+    return response
+
+
 class OfferView(APIView):
     def get_permissions(self):
         """
@@ -59,58 +373,51 @@ class OfferView(APIView):
 
         If a primary key ('pk') is provided in the URL, retrieve and return
         the specific offer after checking permissions. Otherwise, search for
-        offers based on query parameters such as title, zip code, city, and
-        contract IDs. If no search parameters are provided and the user is
-        authenticated, return all offers associated with the user.
+        offers based on query parameters such as title, zip code, city,
+        contract IDs, `near` (a zip code) with a `radius` in km
+        (SEARCH_RADIUS_DEFAULT_KM by default), and a `salary_min` /
+        `salary_max` range. Results are sorted by relevance, or by salary
+        with `sort=salary` or `sort=-salary`. `facets` (e.g.
+        `facets=contract,city,salary`) adds the number of matching offers
+        per contract type, city and salary band. If no search parameters
+        are provided and the user is authenticated, return all offers
+        associated with the user; anonymous users get the public feed of
+        the newest offers, paginated with cursors over a cached id list.
 
         Paginate the results to limit the number of offers per page and
-        serialize the paginated offers for the response.
+        serialize the paginated offers for the response, from rows read
+        with `offer_values` rather than through OfferSerializer. Page-mode
+        searches are paginated over a cached list of ranked ids. When a
+        `cursor` query parameter is present (even empty), keyset
+        pagination is used instead of page numbers: no total count is
+        computed and the response carries opaque `next`/`previous` cursors.
+
+        Pages hold `page_size` offers (OFFER_PAGE_SIZE by default, at most
+        OFFER_MAX_PAGE_SIZE). In page mode, `count=none` skips the total
+        count and reports `has_next` from one extra row, and
+        `count=estimate` also returns an `estimated_count` taken from
+        PostgreSQL's planner statistics (exact below
+        OFFER_COUNT_ESTIMATE_THRESHOLD) for very large result sets.
+
+        Offers carry a strong ETag and a Last-Modified date, pages a weak
+        ETag, and a request whose If-None-Match (or If-Modified-Since)
+        matches gets a 304 Not Modified without serializing anything.
 
         Returns:
-            JsonResponse: Serialized offer data or paginated offers with
-            total pages information.
+            HttpResponse: Serialized offer data or paginated offers with
+            total pages information (page mode) or cursors (cursor mode),
+            encoded as JSON.
         """
         if "pk" in kwargs:
-            offer = get_object_or_404(Offer, pk=kwargs.get("pk"))
-            self.check_object_permissions(request, offer)
-            serializer = OfferSerializer(offer)
-            return JsonResponse(serializer.data)
-
-        title = request.GET.get("title" ,"")
-        zip_code = request.GET.get("zip", "")
-        city = request.GET.get("city", "")
-        contract_ids = request.GET.getlist('contract')
-        page_number = request.GET.get('page')
-        if title or zip_code or city or contract_ids:
-            offers = Offer.search_offers(
-                title, 
-                zip_code, 
-                city, 
-                contract_ids
+            offer = get_object_or_404(
+                offer_values(Offer.objects.all()), pk=kwargs.get("pk")
             )
-        else:
-            if request.user.is_authenticated:
-                
-                professional = get_object_or_404(User, pk=request.user.id)
-                offers = professional.offer_set.all()
-        # Pagination: Limit the number of results per page
-        paginator = Paginator(offers, 10)
-        try:
-            page_obj = paginator.page(page_number)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
-
-        # Serialize the paginated offers
-        serializer = OfferSerializer(page_obj, many=True)
-
-        response_data = {
-            'offers': serializer.data,
-            'total_pages': paginator.num_pages,
-        }
-        # Create response object
-        return JsonResponse(response_data, safe=False)
+            self.check_object_permissions(request, offer)
+            return offer_response(request, offer, get_contract_type_catalogue())
+
+        return offer_list_response(
+            request, list_offers(request.GET, request.user), get_contract_type_catalogue()
+        )
     
     def put(self, request, *args, **kwargs):
         """
@@ -168,13 +475,121 @@ class OfferView(APIView):
     
 
 
+class OfferBulkView(APIView):
+    permission_classes = [IsAuthenticated, IsProfessional]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Handle POST requests to create many offers at once.
+
+        Accepts a JSON array (application/json) or one offer per line
+        (application/x-ndjson). Every row is validated; valid rows are
+        inserted in one transaction with batched INSERTs and the invalid
+        ones are reported by their index in the payload.
+
+        Returns:
+            Response: The number of created offers and the per-row errors,
+            with HTTP 201 when every row was created, 207 when only some
+            were, and 400 when none were.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {'detail': 'Expected a list of offers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > settings.OFFER_BULK_MAX_ROWS:
+            return Response(
+                {'detail': f'A bulk import is limited to {settings.OFFER_BULK_MAX_ROWS} offers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = {'contract_types': get_contract_type_catalogue().by_id}
+        valid_rows, errors = [], []
+        for index, row in enumerate(rows):
+            serializer = OfferBulkSerializer(data=row, context=context)
+            if serializer.is_valid():
+                valid_rows.append(serializer.validated_data)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        offers = bulk_create_offers(
+            request.user, valid_rows, settings.OFFER_BULK_BATCH_SIZE
+        ) if valid_rows else []
+
+        if not offers:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({
+            'created': len(offers),
+            'ids': [offer.id for offer in offers],
+            'errors': errors,
+        }, status=response_status)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsProfessional])
+def export_offers(request, export_format):
+    """
+    Stream every offer of the professional as NDJSON or CSV.
+
+    The offers are read through a server-side cursor and formatted as
+    they are sent, so memory use does not grow with the number of offers
+    and no count is run.
+
+    Args:
+        export_format (str): `ndjson` or `csv`, from the URL.
+
+    Returns:
+        StreamingHttpResponse: The offers, as an attachment.
+
+    Raises:
+        NotFound: If the format is not supported.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise NotFound(f'Unsupported export format {export_format}.')
+    chunk_size = settings.OFFER_EXPORT_CHUNK_SIZE
+    # request.user is a TokenUser, without related managers
+    rows = offer_rows(Offer.objects.filter(professional_id=request.user.id), chunk_size)
+    response = StreamingHttpResponse(
+        export_lines(
+            rows, export_format, get_contract_type_catalogue().names, chunk_size
+        ),
+        content_type=EXPORT_FORMATS[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="offers.{export_format}"'
+    return response
+
+
+def contract_type_response(request, catalogue, response_class):
+    """
+    Answer with the contract type catalogue, or with a 304 when the
+    client's copy (If-None-Match) is current, along with its ETag and
+    Cache-Control headers.
+    """
+    response = get_conditional_response(request, etag=catalogue.etag)
+    if response is None:
+        response = response_class(catalogue.data)
+    response['ETag'] = catalogue.etag
+    patch_cache_control(
+        response, public=True, max_age=settings.CONTRACT_TYPE_CACHE_MAX_AGE
+    )
+    return response
+
+
 @api_view(['GET'])
 def get_all_contract_type(request):
     """
     Retrieve all contract types.
 
-    This view handles GET requests to retrieve all contract types from the database.
-    It serializes the data using the ContractTypeSerializer and returns it in the response.
+    This view handles GET requests to retrieve all contract types. The
+    catalogue is served from cache and carries an ETag and a
+    Cache-Control max-age so clients can revalidate it with
+    If-None-Match and receive a 304 Not Modified while it is unchanged.
 
     Args:
         request (HttpRequest): The request object.
@@ -182,6 +597,61 @@ def get_all_contract_type(request):
     Returns:
         Response: A Response object containing serialized contract type data.
     """
-    contract_types = ContractType.objects.all()
-    serializer = ContractTypeSerializer(contract_types, many=True)
-    return Response(serializer.data)
+    return contract_type_response(request, get_contract_type_catalogue(), Response)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_search_cache_stats(request):
+    """
+    Report hit and miss counters of the offer search result cache.
+
+    Returns:
+        Response: The `hits`, `misses` and `hit_ratio` of the cache.
+    """
+    return Response(search_cache_stats())
+
+
+@api_view(['GET'])
+def get_suggestions(request):
+    """
+    Complete a partially typed offer title or city.
+
+    Terms are matched by the start of any of their words, ignoring case
+    and accents, and the most used come first. Completions are served
+    from the in-memory suggestion index of the process, without touching
+    the database, so the endpoint can be called on every keystroke.
+
+    Query parameters:
+        q: The typed text.
+        limit: The number of completions of each kind (SUGGESTION_LIMIT by
+            default, at most SUGGESTION_MAX_LIMIT).
+
+    Returns:
+        Response: The matching `titles` and `cities`.
+
+    Raises:
+        ValidationError: If `limit` is not a positive integer.
+    """
+    prefix = normalize_text(request.GET.get('q', ''))
+    try:
+        limit = int(request.GET.get('limit', settings.SUGGESTION_LIMIT))
+    except ValueError:
+        raise ValidationError({'limit': 'Must be an integer.'})
+    if limit < 1:
+        raise ValidationError({'limit': 'Must be positive.'})
+    limit = min(limit, settings.SUGGESTION_MAX_LIMIT)
+
+    if prefix:
+        index = get_suggestion_index()
+        data = {
+            'titles': index.suggest(SuggestionTerm.TITLE, prefix, limit),
+            'cities': index.suggest(SuggestionTerm.CITY, prefix, limit),
+        }
+    else:
+        data = {'titles': [], 'cities': []}
+    response = Response(data)
+    patch_cache_control(
+        response, public=True, max_age=settings.SUGGESTION_INDEX_MAX_AGE
+    )
+    return response
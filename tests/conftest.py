@@ -1,8 +1,10 @@
 import pytest
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.management import call_command
 from django.db import connection
+from offers import cache as offers_cache
 from offers.models import Offer, ContractType
 from accounts.models import Profile
 
@@ -16,6 +18,12 @@ def enable_pg_trgm_and_migrate(django_db_setup, django_db_blocker):
             
             # Run migrations to ensure database schema is up-to-date
             call_command('migrate', interactive=False)
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Database rows are rolled back after each test, cached copies are not
+    cache.clear()
+    offers_cache._suggestion_index = None
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -13,4 +13,172 @@ def test_asgi_application():
 
 def test_wsgi_application():
     """Test if WSGI application initializes without errors."""
-    assert wsgi_app is not None
\ No newline at end of file
+    assert wsgi_app is not None
+
+@pytest.mark.django_db
+def test_metrics_endpoint(api_client, create_contract_types):
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    requests = sample('django_request_duration_seconds_count', view='offer-list', method='GET', status='200')
+    searches = sample('offer_search_components_total', component='trigram')
+    misses = sample('offer_cache_requests_total', cache='search', result='miss')
+
+    api_client.get('/offers/', {'title': 'Offer'})
+
+    assert sample('django_request_duration_seconds_count', view='offer-list', method='GET', status='200') == requests + 1
+    assert sample('offer_search_components_total', component='trigram') == searches + 1
+    assert sample('offer_cache_requests_total', cache='search', result='miss') == misses + 1
+    assert sample('offer_search_duration_seconds_count', plan='fts+trigram') >= 1
+
+    response = api_client.get('/metrics')
+    assert response.status_code == 200
+    body = response.content.decode()
+    assert 'django_request_db_queries_bucket{' in body
+    assert 'view="offer-list"' in body
+
+
+def test_metrics_endpoint_multiprocess(client, monkeypatch, tmp_path):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    response = client.get('/metrics')
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_access(client, admin_user):
+    from prometheus_client import REGISTRY
+
+    assert client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code == 403
+    client.force_login(admin_user)
+    assert client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code == 200
+
+    labels = {'view': 'metrics', 'method': 'other', 'status': '200'}
+    before = REGISTRY.get_sample_value('django_request_duration_seconds_count', labels) or 0
+    client.generic('BREW', '/metrics')
+    assert REGISTRY.get_sample_value('django_request_duration_seconds_count', labels) == before + 1
+
+
+def test_celery_task_duration():
+    from prometheus_client import REGISTRY
+    from config.metrics import _task_postrun, _task_prerun
+
+    task = type('Task', (), {'name': 'offers.tasks.some_task'})()
+    before = REGISTRY.get_sample_value(
+        'celery_task_duration_seconds_count', {'task': task.name, 'state': 'SUCCESS'}
+    ) or 0
+    _task_prerun(task_id='1', task=task)
+    _task_postrun(task_id='1', task=task, state='SUCCESS')
+    assert REGISTRY.get_sample_value(
+        'celery_task_duration_seconds_count', {'task': task.name, 'state': 'SUCCESS'}
+    ) == before + 1
+
+
+def test_traces_sampler(settings):
+    from config.instrumentation import traces_sampler
+
+    settings.SENTRY_TRACES_SAMPLE_RATE = 0.05
+    settings.SENTRY_TRACES_SAMPLE_RATES = {'offer-list': 0.5, 'metrics': 0.0}
+
+    assert traces_sampler({'wsgi_environ': {'PATH_INFO': '/offers/'}}) == 0.5
+    assert traces_sampler({'asgi_scope': {'path': '/metrics'}}) == 0.0
+    assert traces_sampler({'wsgi_environ': {'PATH_INFO': '/no-such-page/'}}) == 0.05
+    # Celery tasks have no request
+    assert traces_sampler({'celery_job': {'task': 'some_task'}}) == 0.05
+    assert traces_sampler({'parent_sampled': True, 'asgi_scope': {'path': '/metrics'}}) == 1.0
+
+
+@pytest.mark.django_db
+def test_profiling_header(api_client, create_professional, create_user):
+    from accounts.tokens import ProfileRefreshToken as RefreshToken
+
+    create_professional.is_staff = True
+    create_professional.save()
+
+    response = api_client.get('/offers/get-all-contract-type/', HTTP_X_PROFILE='tottime')
+    assert response['Content-Type'] != 'text/plain'
+
+    token = RefreshToken.for_user(create_user).access_token
+    response = api_client.get(
+        '/offers/get-all-contract-type/', HTTP_X_PROFILE='tottime',
+        HTTP_AUTHORIZATION=f'Bearer {token}'
+    )
+    assert response['Content-Type'] != 'text/plain'
+
+    response = api_client.get(
+        '/offers/get-all-contract-type/', HTTP_X_PROFILE='tottime',
+        HTTP_AUTHORIZATION='Bearer not-a-token'
+    )
+    assert response['Content-Type'] != 'text/plain'
+
+    token = RefreshToken.for_user(create_professional).access_token
+    response = api_client.get(
+        '/offers/get-all-contract-type/', HTTP_X_PROFILE='tottime',
+        HTTP_AUTHORIZATION=f'Bearer {token}'
+    )
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/plain'
+    assert 'function calls' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_profiling_disabled(client, settings, admin_user):
+    settings.PROFILING_ENABLED = False
+    client.force_login(admin_user)
+    response = client.get('/metrics', HTTP_X_PROFILE='')
+    assert 'function calls' not in response.content.decode()
+
+    settings.PROFILING_ENABLED = True
+    response = client.get('/metrics', HTTP_X_PROFILE='')
+    assert 'function calls' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_async_middlewares(admin_user):
+    from asgiref.sync import async_to_sync
+    from django.http import HttpResponse
+    from django.test import AsyncRequestFactory
+    from django.urls import resolve
+    from prometheus_client import REGISTRY
+    from config.instrumentation import ProfilingMiddleware
+    from config.metrics import PrometheusMiddleware
+
+    async def view(request):
+        request.resolver_match = resolve('/metrics')
+        return HttpResponse('ok')
+
+    async def auser():
+        return admin_user
+
+    labels = {'view': 'metrics', 'method': 'GET', 'status': '200'}
+    before = REGISTRY.get_sample_value('django_request_duration_seconds_count', labels) or 0
+    middleware = PrometheusMiddleware(ProfilingMiddleware(view))
+    request = AsyncRequestFactory().get('/metrics')
+    request.auser = auser
+    assert async_to_sync(middleware)(request).content == b'ok'
+    assert REGISTRY.get_sample_value('django_request_duration_seconds_count', labels) == before + 1
+
+    request = AsyncRequestFactory().get('/metrics', headers={'x-profile': 'tottime'})
+    request.auser = auser
+    assert 'function calls' in async_to_sync(middleware)(request).content.decode()
+
+
+def test_shared_cache_check(settings):
+    from config.checks import check_shared_cache
+
+    assert check_shared_cache(None) == []
+    settings.REQUIRE_SHARED_CACHE = True
+    assert [error.id for error in check_shared_cache(None)] == ['config.E001']
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+    assert check_shared_cache(None) == []
+
+
+def test_prod_warns_without_sentry_dsn(monkeypatch, caplog):
+    import importlib
+    import sys
+
+    monkeypatch.setattr('config.base.SENTRY_DSN', None)
+    monkeypatch.delitem(sys.modules, 'config.prod', raising=False)
+    importlib.import_module('config.prod')
+    assert 'SENTRY_DSN is not set' in caplog.text
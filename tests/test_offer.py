@@ -1,4 +1,7 @@
+import asyncio
+import json
 import pytest
+import time
 
 from django.urls import reverse
 from rest_framework import status
@@ -10,6 +13,11 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from offers.views import OfferView
 from config.permissions import IsProfessional, IsOwner
 from unittest.mock import patch
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 @pytest.mark.django_db
 def test_get_all_contracts_types(api_client, create_contract_types):
@@ -20,6 +28,36 @@ def test_get_all_contracts_types(api_client, create_contract_types):
     assert len(response.data) == 3
     assert response.data[0]['name'] == 'CDI'
 
+@pytest.mark.django_db
+def test_contract_types_revalidation(
+    api_client,
+    create_contract_types,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    url = reverse('get-all-contract-type')
+    response = api_client.get(url)
+    etag = response['ETag']
+    assert 'max-age=300' in response['Cache-Control']
+
+    # Warm catalogue: no database query, and a 304 for a matching ETag
+    with django_assert_num_queries(0):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ContractType.objects.create(name='Interim')
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+    assert [c['name'] for c in response.data] == ['CDI', 'CDD', 'Freelance', 'Interim']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ContractType.objects.get(name='Interim').delete()
+    response = api_client.get(url)
+    assert len(response.data) == 3
+
 # Create
 @pytest.mark.django_db
 def test_create_offer(
@@ -1123,4 +1161,1208 @@ def test_offer_view_fallback_permissions():
         mock_super.assert_called_once()
 
         # Ensure it returned the "fallback" value
-        assert permissions == ["fallback"]
\ No newline at end of file
+        assert permissions == ["fallback"]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "title, zip_code, city, contracts",
+    [
+        ('Offer', '', '', []),
+        ('Offe', '75000', 'Paris', []),
+        ('', '', '', ['cdi', 'cdd']),
+        ('Offer', '59000', 'Lille', ['cdi', 'cdd']),
+    ],
+)
+def test_search_offers_runs_single_query(
+    create_contract_types,
+    create_professional,
+    get_cdi,
+    get_cdd,
+    get_freelance,
+    django_assert_num_queries,
+    title,
+    zip_code,
+    city,
+    contracts,
+):
+    create_offers(create_professional, get_cdi, get_cdd, get_freelance)
+    contract_ids = [{'cdi': get_cdi, 'cdd': get_cdd}[c].id for c in contracts]
+
+    with django_assert_num_queries(1):
+        offers = list(Offer.search_offers(title, zip_code, city, contract_ids))
+
+    assert offers
+    ordering = [(-o.rank, -o.similarity, o.id) for o in offers]
+    assert ordering == sorted(ordering)
+
+
+@pytest.mark.django_db
+def test_search_cursor_pagination(
+    create_contract_types,
+    create_professional,
+    api_client,
+    get_cdi,
+    get_cdd,
+    get_freelance,
+):
+    create_offers(create_professional, get_cdi, get_cdd, get_freelance)
+    url = reverse('offer-list')
+    expected = [
+        offer.id for offer in Offer.search_offers('Offe', '', '', [])
+    ]
+
+    # Walk forward without ever counting the result set
+    seen = []
+    cursor = ''
+    pages = []
+    while cursor is not None:
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, {'title': 'Offe', 'cursor': cursor})
+        assert not any('COUNT(' in q['sql'] for q in queries.captured_queries)
+        assert response.status_code == status.HTTP_200_OK
+        response_data = response.json()
+        assert 'total_pages' not in response_data
+        seen += [offer['id'] for offer in response_data['offers']]
+        pages.append(response_data)
+        cursor = response_data['next']
+    assert seen == expected
+    assert len(pages) == 2
+    assert pages[0]['previous'] is None
+
+    # And back again from the last page
+    response = api_client.get(
+        url, {'title': 'Offe', 'cursor': pages[-1]['previous']}
+    )
+    response_data = response.json()
+    assert [offer['id'] for offer in response_data['offers']] == expected[:10]
+    assert response_data['previous'] is None
+    assert response_data['next'] == pages[0]['next']
+
+
+@pytest.mark.django_db
+def test_my_offers_cursor_pagination(
+    create_professional,
+    api_client,
+    create_contract_types,
+    get_cdi,
+):
+    force_authenticate(api_client, create_professional)
+    for i in range(1, 13):
+        create_offer(create_professional, f'Offer {i}', '75000', 'Paris', 30000, [get_cdi])
+    url = reverse('offer-list')
+
+    response = api_client.get(url, {'cursor': ''})
+    response_data = response.json()
+    assert len(response_data['offers']) == 10
+    assert response_data['offers'][0]['title'] == 'Offer 1'
+
+    response = api_client.get(url, {'cursor': response_data['next']})
+    response_data = response.json()
+    assert [offer['title'] for offer in response_data['offers']] == ['Offer 11', 'Offer 12']
+    assert response_data['next'] is None
+
+
+@pytest.mark.django_db
+def test_search_invalid_cursor(api_client):
+    url = reverse('offer-list')
+    response = api_client.get(url, {'title': 'Offer', 'cursor': 'not-a-cursor'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['cursor'] == 'Invalid cursor.'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('values', [
+    ['abc', 0, 1], [None, 0, 1], [1.0, 0, 'x'], [[1], 0, 1], [1.0, 0, 1.5], [True, 0, 1],
+])
+def test_search_tampered_cursor(api_client, create_professional, values):
+    from offers.pagination import encode_cursor
+
+    url = reverse('offer-list')
+    response = api_client.get(url, {'title': 'Offer', 'cursor': encode_cursor(values)})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['cursor'] == 'Invalid cursor.'
+
+    # My offers are ordered by id alone
+    force_authenticate(api_client, create_professional)
+    response = api_client.get(url, {'cursor': encode_cursor([values[0]])})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert api_client.get(url, {'cursor': encode_cursor([float('nan')])}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_search_invalid_contract(api_client):
+    response = api_client.get(reverse('offer-list'), {'contract': ['1', 'abc']})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'contract' in response.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{}, {'title': 'Offer'}, {'cursor': ''}])
+def test_offer_list_queries_do_not_grow_with_page_size(
+    create_professional,
+    api_client,
+    create_contract_types,
+    get_cdi,
+    get_cdd,
+    params,
+    django_capture_on_commit_callbacks,
+):
+    force_authenticate(api_client, create_professional)
+    url = reverse('offer-list')
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return len(response.json()['offers']), len(queries)
+
+    create_offer(create_professional, 'Offer 1', '75000', 'Paris', 30000, [get_cdi, get_cdd])
+    count_queries()  # warm the contract type catalogue and search cache
+    size, small_page_queries = count_queries()
+    assert size == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for i in range(2, 16):
+            create_offer(create_professional, f'Offer {i}', '75000', 'Paris', 30000, [get_cdi, get_cdd])
+    count_queries()
+    size, full_page_queries = count_queries()
+    assert size == 10
+
+    assert full_page_queries == small_page_queries
+
+
+@pytest.mark.django_db
+def test_search_result_cache(
+    create_contract_types,
+    create_professional,
+    api_client,
+    get_cdi,
+    get_cdd,
+    get_freelance,
+    django_capture_on_commit_callbacks,
+):
+    create_offers(create_professional, get_cdi, get_cdd, get_freelance)
+    url = reverse('offer-list')
+
+    response = api_client.get(url, {'title': 'Offer', 'contract': [get_cdd.id, get_cdi.id]})
+    first_page = response.json()
+    assert first_page['total_pages'] == 2
+
+    # Same search in another case, spacing and contract order: served from
+    # the cached ids, pages are sliced from it
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url, {'title': ' OFFER ', 'contract': [get_cdi.id, get_cdd.id]})
+    assert response.json() == first_page
+    assert not any('COUNT(' in q['sql'] for q in queries.captured_queries)
+    response = api_client.get(url, {'title': 'offer', 'contract': [get_cdi.id, get_cdd.id], 'page': 2})
+    second_page = response.json()
+    assert len(second_page['offers']) == 5
+
+    create_professional.is_staff = True
+    force_authenticate(api_client, create_professional)
+    stats = api_client.get(reverse('search-cache-stats')).json()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+
+    # Writes start a new generation
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse('offer-create'), {
+            "title": "Offer 99",
+            "zip": "75001",
+            "city": "Paris",
+            "salary": 40000,
+            "contract": [get_cdi.id],
+        }, format='json')
+    response = api_client.get(url, {'title': 'offer', 'contract': [get_cdi.id, get_cdd.id], 'page': 2})
+    assert len(response.json()['offers']) == 6
+
+    offer = Offer.objects.get(title='Offer 99')
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.delete(reverse('offer-delete', args=[offer.id]))
+    response = api_client.get(url, {'title': 'offer', 'contract': [get_cdi.id, get_cdd.id], 'page': 2})
+    assert response.json() == second_page
+
+
+@pytest.mark.django_db
+def test_search_cache_stats_requires_admin(api_client, create_professional):
+    force_authenticate(api_client, create_professional)
+    response = api_client.get(reverse('search-cache-stats'))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_search_result_cache_beyond_cached_prefix(
+    create_contract_types,
+    create_professional,
+    api_client,
+    get_cdi,
+    get_cdd,
+    get_freelance,
+    settings,
+):
+    settings.SEARCH_CACHE_MAX_RESULTS = 12
+    create_offers(create_professional, get_cdi, get_cdd, get_freelance)
+    url = reverse('offer-list')
+    expected = [offer.id for offer in Offer.search_offers('offer', '', '', [])]
+
+    response = api_client.get(url, {'title': 'Offer', 'page': 1})
+    assert response.json()['total_pages'] == 2
+    assert [o['id'] for o in response.json()['offers']] == expected[:10]
+    response = api_client.get(url, {'title': 'Offer', 'page': 2})
+    assert [o['id'] for o in response.json()['offers']] == expected[10:]
+
+
+# Bulk create
+@pytest.mark.django_db
+def test_bulk_create_offers(
+    api_client,
+    create_professional,
+    create_contract_types,
+    get_cdi,
+    get_cdd,
+    django_assert_max_num_queries,
+):
+    force_authenticate(api_client, create_professional)
+    data = [
+        {
+            "title": f"Développeur {i}",
+            "zip": "75001",
+            "city": "Paris",
+            "salary": 40000 + i,
+            "contract": [get_cdi.id, get_cdd.id, get_cdi.id],
+        }
+        for i in range(200)
+    ]
+    with django_assert_max_num_queries(8):
+        response = api_client.post(reverse('offer-bulk-create'), data, format='json')
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['created'] == 200
+    assert response.data['errors'] == []
+    assert Offer.objects.filter(professional=create_professional).count() == 200
+    assert Offer.contract.through.objects.count() == 400
+    # The search_vector trigger ran for bulk inserted rows
+    assert Offer.search_offers('Développeur', '', '', []).count() == 200
+
+
+@pytest.mark.django_db
+def test_bulk_create_offers_ndjson_with_errors(
+    api_client,
+    create_professional,
+    create_contract_types,
+    get_freelance,
+):
+    force_authenticate(api_client, create_professional)
+    lines = [
+        {"title": "Offer 1", "zip": "69000", "city": "Lyon", "salary": 30000, "contract": [get_freelance.id]},
+        {"title": "", "zip": "69000", "city": "Lyon", "salary": 30000, "contract": [get_freelance.id]},
+        {"title": "Offer 3", "zip": "69000", "city": "Lyon", "salary": 30000, "contract": []},
+        {"title": "Offer 4", "zip": "69000", "city": "Lyon", "salary": 30000, "contract": [999999]},
+    ]
+    body = '\n'.join(json.dumps(line) for line in lines) + '\n\n'
+    response = api_client.post(
+        reverse('offer-bulk-create'), body, content_type='application/x-ndjson'
+    )
+
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    assert response.data['created'] == 1
+    errors = {error['index']: error['errors'] for error in response.data['errors']}
+    assert errors[1]['title'][0] == 'This field may not be blank.'
+    assert errors[2]['contract'][0] == 'This field cant be null.'
+    assert errors[3]['contract'][0] == 'Invalid pk "999999" - object does not exist.'
+    assert list(Offer.objects.values_list('title', flat=True)) == ['Offer 1']
+
+
+@pytest.mark.django_db
+def test_bulk_create_offers_rejected(
+    api_client,
+    create_professional,
+    create_user,
+    settings,
+):
+    url = reverse('offer-bulk-create')
+    force_authenticate(api_client, create_user)
+    response = api_client.post(url, [], format='json')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    force_authenticate(api_client, create_professional)
+    response = api_client.post(url, {"title": "Offer"}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    settings.OFFER_BULK_MAX_ROWS = 1
+    response = api_client.post(url, [{}, {}], format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.post(url, '{"title": ', content_type='application/x-ndjson')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'line 1' in response.data['detail']
+
+
+# Management commands
+@pytest.mark.django_db
+def test_create_offers_command(create_professional):
+    call_command('create_offers', count=25, batch_size=10, seed=7, professionals=2, stdout=StringIO())
+
+    assert Offer.objects.count() == 25
+    assert Offer.objects.filter(professional=create_professional).exists()
+    assert Offer.objects.filter(contract__isnull=True).count() == 0
+    assert Offer.objects.filter(search_vector__isnull=True).count() == 0
+    first_run = list(Offer.objects.order_by('id').values_list('title', 'city', 'zip', 'salary'))
+
+    Offer.objects.all().delete()
+    call_command('create_offers', count=25, batch_size=10, seed=7, professionals=2, stdout=StringIO())
+    assert list(Offer.objects.order_by('id').values_list('title', 'city', 'zip', 'salary')) == first_run
+
+    for batch_size in [0, -1]:
+        with pytest.raises(CommandError):
+            call_command('create_offers', count=5, batch_size=batch_size, stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_benchmark_search_command(create_professional, tmp_path):
+    output = tmp_path / 'report.json'
+    call_command(
+        'benchmark_search', sizes='20,40', iterations=2, output=str(output), stdout=StringIO()
+    )
+
+    report = json.loads(output.read_text())
+    assert Offer.objects.count() == 40
+    assert set(report['sizes']) == {'20', '40'}
+    title = report['sizes']['40']['title']
+    assert set(title) == {'search_offers', 'count', 'view_cold', 'view_warm', 'explain'}
+    assert title['search_offers']['queries'] == 1
+    assert title['view_cold']['p50_ms'] <= title['view_cold']['p99_ms']
+    assert any('Scan' in line for line in title['explain'])
+
+    with pytest.raises(CommandError):
+        call_command('benchmark_search', sizes='10', iterations=1, output=str(output), stdout=StringIO())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_read_views(
+    api_client, create_professional, create_contract_types, get_cdi, get_cdd, get_freelance
+):
+    from asgiref.sync import async_to_sync
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import AsyncRequestFactory
+    from accounts.tokens import ProfileRefreshToken
+    from offers.async_views import contract_types, offer_detail, offer_list, read_view
+
+    create_offers(create_professional, get_cdi, get_cdd, get_freelance)
+    offer = Offer.objects.order_by('id').first()
+    factory = AsyncRequestFactory()
+
+    async def anonymous():
+        return AnonymousUser()
+
+    def call(view, path, params=None, **kwargs):
+        request = factory.get(path, params or {}, **kwargs)
+        # Set by AuthenticationMiddleware
+        request.auser = anonymous
+        return async_to_sync(view)(request)
+
+    for params in [{'title': 'Offer'}, {'title': 'Offer', 'page': 2}, {'city': 'Lyon', 'cursor': ''}]:
+        response = call(offer_list, '/offers/', params)
+        assert response.status_code == 200
+        assert json.loads(response.content) == api_client.get('/offers/', params).json()
+
+    response = call(offer_list, '/offers/', {'title': 'Offer', 'cursor': 'bad'})
+    assert response.status_code == 400
+    assert 'cursor' in json.loads(response.content)
+
+    # Searches of one process run in parallel
+    def slow_search(params, user):
+        time.sleep(0.2)
+        return {'offers': []}
+
+    async def two_searches():
+        requests = [factory.get('/offers/', {'title': 'Offer'}) for _ in range(2)]
+        for request in requests:
+            request.auser = anonymous
+        return await asyncio.gather(*[offer_list(request) for request in requests])
+
+    with patch('offers.async_views.list_offers', side_effect=slow_search):
+        start = time.perf_counter()
+        assert [r.status_code for r in async_to_sync(two_searches)()] == [200, 200]
+        assert time.perf_counter() - start < 0.35
+
+    token = ProfileRefreshToken.for_user(create_professional).access_token
+    response = call(offer_list, '/offers/', headers={'authorization': f'Bearer {token}'})
+    assert len(json.loads(response.content)['offers']) == 10
+    response = call(offer_list, '/offers/', headers={'authorization': 'Bearer bad'})
+    assert response.status_code == 401
+
+    request = factory.get(f'/offers/{offer.pk}/')
+    response = async_to_sync(offer_detail)(request, pk=offer.pk)
+    assert json.loads(response.content) == api_client.get(f'/offers/{offer.pk}/').json()
+    response = async_to_sync(offer_detail)(factory.get('/offers/0/'), pk=0)
+    assert response.status_code == 404
+
+    response = async_to_sync(contract_types)(factory.get('/offers/get-all-contract-type/'))
+    assert [c['name'] for c in json.loads(response.content)] == ['CDI', 'CDD', 'Freelance']
+    request = factory.get('/offers/get-all-contract-type/', headers={'if-none-match': response['ETag']})
+    assert async_to_sync(contract_types)(request).status_code == 304
+
+    # Writes on the same URL go to the DRF view
+    view = read_view(offer_detail, OfferView.as_view())
+    request = factory.delete(f'/offers/{offer.pk}/', headers={'authorization': f'Bearer {token}'})
+    assert async_to_sync(view)(request, pk=offer.pk).status_code == 200
+    assert not Offer.objects.filter(pk=offer.pk).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_servers_command(live_server, create_professional, create_contract_types, tmp_path):
+    output = tmp_path / 'report.json'
+    call_command(
+        'benchmark_servers', f'wsgi={live_server.url}', f'other={live_server.url}',
+        concurrency='1,2', requests=6, workers=1, output=str(output), stdout=StringIO()
+    )
+
+    report = json.loads(output.read_text())
+    assert set(report['targets']) == {'wsgi', 'other'}
+    result = report['targets']['wsgi']['2']
+    assert result['errors'] == 0
+    assert result['iterations'] == 6
+    assert result['requests_per_second'] > 0
+
+
+@pytest.mark.django_db
+def test_search_document_follows_offers(
+    create_professional, create_contract_types, get_cdi, get_cdd, get_freelance
+):
+    from offers.models import OfferSearchDocument
+    from offers.serializers import bulk_create_offers
+
+    offer = create_offer(create_professional, 'Développeur Python', '75011', 'Paris', 40000, [get_cdi])
+    document = OfferSearchDocument.objects.get(offer=offer)
+    assert document.title == 'developpeur python'
+    assert (document.zip, document.city, document.salary) == ('75011', 'Paris', 40000)
+    assert document.contract_ids == [get_cdi.id]
+    assert document.search_vector == Offer.objects.get(pk=offer.pk).search_vector
+
+    offer.contract.add(get_freelance, get_cdd)
+    offer.contract.remove(get_cdi)
+    offer.title = 'Chef de projet'
+    offer.salary = 50000
+    offer.save()
+    document.refresh_from_db()
+    assert document.title == 'chef de projet'
+    assert document.salary == 50000
+    assert document.contract_ids == sorted([get_cdd.id, get_freelance.id])
+
+    offers = bulk_create_offers(create_professional, [
+        {'title': f'Offer {i}', 'zip': '69001', 'city': 'Lyon', 'salary': 30000,
+         'contract': [get_cdi.id, get_cdd.id]}
+        for i in range(3)
+    ], batch_size=2)
+    assert list(
+        OfferSearchDocument.objects.filter(offer__in=offers).values_list('contract_ids', flat=True)
+    ) == [sorted([get_cdi.id, get_cdd.id])] * 3
+
+    offer.delete()
+    assert not OfferSearchDocument.objects.filter(pk=offer.pk).exists()
+
+
+@pytest.mark.django_db
+def test_search_uses_document_only(
+    create_professional, create_contract_types, get_cdi, get_cdd, get_freelance
+):
+    create_offer(create_professional, 'Développeur Python', '75011', 'Paris', 40000, [get_cdi, get_cdd])
+    create_offer(create_professional, 'Développeur Java', '69001', 'Lyon', 40000, [get_freelance])
+
+    # Accents and case are folded on both sides of the trigram match
+    offers = Offer.search_offers('developeur', '', '', [str(get_cdi.id), str(get_cdd.id)])
+    assert [o.title for o in offers] == ['Développeur Python']
+
+    with CaptureQueriesContext(connection) as captured:
+        list(offers.all())
+    sql = captured.captured_queries[0]['sql']
+    assert 'DISTINCT' not in sql
+    assert 'offers_offer_contract' not in sql
+
+
+@pytest.mark.django_db
+def test_search_folds_accents_and_case(api_client, create_professional, create_contract_types, get_cdi):
+    from offers.cache import normalize_search_terms, search_cache_stats
+
+    create_offer(create_professional, 'Développeur Électronique', '75011', 'Saint-Étienne', 40000, [get_cdi])
+    create_offer(create_professional, 'Comptable', '42000', 'Saint-Étienne', 40000, [get_cdi])
+
+    # Served by the full-text path, not by the trigram fallback
+    for title in ['developpeur electronique', 'DÉVELOPPEUR', 'Developpeurs']:
+        offers = list(Offer.search_offers(title, '', '', []))
+        assert [o.title for o in offers] == ['Développeur Électronique']
+        assert offers[0].rank > 0
+    assert Offer.search_offers('', '', 'saint etienne', []).count() == 2
+
+    assert normalize_search_terms(' Développeur  ÉLECTRONIQUE', '', 'Saint-Étienne', []) == (
+        'developpeur electronique', '', 'saint-etienne', [], '', None, None, None, 'relevance'
+    )
+    api_client.get('/offers/', {'title': 'Développeur'})
+    api_client.get('/offers/', {'title': 'developpeur'})
+    assert search_cache_stats()['hits'] == 1
+
+
+@pytest.mark.django_db
+def test_suggestion_terms_follow_offers(create_professional, create_contract_types, get_cdi):
+    from offers.models import SuggestionTerm
+    from offers.serializers import bulk_create_offers
+
+    def counts():
+        return dict(
+            SuggestionTerm.objects.filter(offer_count__gt=0)
+            .values_list('normalized', 'offer_count')
+        )
+
+    offer = create_offer(create_professional, 'Développeur Python', '75011', 'Paris', 40000, [get_cdi])
+    bulk_create_offers(create_professional, [
+        {'title': 'développeur python', 'zip': '69001', 'city': 'Lyon', 'salary': 30000,
+         'contract': [get_cdi.id]}
+        for _ in range(2)
+    ], batch_size=10)
+    assert counts() == {'developpeur python': 3, 'paris': 1, 'lyon': 2}
+
+    offer.title = 'Comptable'
+    offer.city = 'Lyon'
+    offer.save()
+    assert counts() == {'developpeur python': 2, 'comptable': 1, 'lyon': 3}
+
+    Offer.objects.filter(city='Lyon', title__startswith='d').delete()
+    assert counts() == {'comptable': 1, 'lyon': 1}
+
+
+@pytest.mark.django_db
+def test_suggestions(api_client, create_professional, create_contract_types, get_cdi, settings):
+    settings.SUGGESTION_INDEX_MAX_AGE = 0
+    url = reverse('offer-suggestions')
+    for title, city in [
+        ('Développeur Python', 'Paris'),
+        ('Développeur Python', 'Saint-Étienne'),
+        ('Développeur Java', 'Paris'),
+        ('Data Engineer', 'Pau'),
+    ]:
+        create_offer(create_professional, title, '75011', city, 40000, [get_cdi])
+
+    response = api_client.get(url, {'q': 'dev'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        'titles': ['Développeur Python', 'Développeur Java'], 'cities': []
+    }
+    assert 'max-age=0' in response['Cache-Control']
+
+    # Any word of a term, ignoring case and accents, most used first
+    assert api_client.get(url, {'q': 'PYTH'}).json()['titles'] == ['Développeur Python']
+    assert api_client.get(url, {'q': 'pa'}).json() == {
+        'titles': [], 'cities': ['Paris', 'Pau']
+    }
+    assert api_client.get(url, {'q': 'etie'}).json()['cities'] == ['Saint-Étienne']
+    assert api_client.get(url, {'q': 'pa', 'limit': 1}).json()['cities'] == ['Paris']
+    assert api_client.get(url, {'q': ' '}).json() == {'titles': [], 'cities': []}
+
+    assert api_client.get(url, {'q': 'pa', 'limit': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert api_client.get(url, {'q': 'pa', 'limit': 0}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+def test_suggestion_index_refresh(
+    api_client, create_professional, create_contract_types, get_cdi, settings,
+    django_capture_on_commit_callbacks
+):
+    from offers import cache as offers_cache
+    from offers.cache import SUGGESTIONS_VERSION_KEY, get_suggestion_index
+    from django.core.cache import cache
+
+    settings.SUGGESTION_INDEX_MAX_AGE = 0
+    url = reverse('offer-suggestions')
+    create_offer(create_professional, 'Comptable', '75011', 'Paris', 40000, [get_cdi])
+    index = get_suggestion_index()
+
+    # Unchanged dictionary: the index is kept and completions run no query
+    with CaptureQueriesContext(connection) as captured:
+        assert api_client.get(url, {'q': 'comp'}).json()['titles'] == ['Comptable']
+    assert len(captured) == 0
+    assert get_suggestion_index() is index
+
+    # Edits leaving titles and cities alone keep the version
+    version = cache.get(SUGGESTIONS_VERSION_KEY)
+    offer = Offer.objects.get()
+    offer.salary = 41000
+    offer.save()
+    assert cache.get(SUGGESTIONS_VERSION_KEY) == version
+    offer.city = 'Lyon'
+    offer.save()
+    assert cache.get(SUGGESTIONS_VERSION_KEY) != version
+
+    get_suggestion_index()
+    offers_cache._suggestion_reload.join()
+
+    # A new version is loaded in the background, the old index is served
+    # in the meantime
+    index = get_suggestion_index()
+    assert index.version == cache.get(SUGGESTIONS_VERSION_KEY)
+    with django_capture_on_commit_callbacks(execute=True):
+        create_offer(create_professional, 'Compositeur', '75011', 'Paris', 40000, [get_cdi])
+    with CaptureQueriesContext(connection) as captured:
+        assert api_client.get(url, {'q': 'comp'}).json()['titles'] == ['Comptable']
+    assert len(captured) == 0
+    offers_cache._suggestion_reload.join()
+    assert api_client.get(url, {'q': 'comp'}).json()['titles'] == ['Compositeur', 'Comptable']
+    assert get_suggestion_index() is not index
+
+    # Within SUGGESTION_INDEX_MAX_AGE the shared version is not even checked
+    settings.SUGGESTION_INDEX_MAX_AGE = 60
+    index = get_suggestion_index()
+    with django_capture_on_commit_callbacks(execute=True):
+        create_offer(create_professional, 'Compositeur', '75011', 'Paris', 40000, [get_cdi])
+    assert get_suggestion_index() is index
+
+
+@pytest.mark.django_db
+def test_benchmark_suggestions_command(create_professional, create_contract_types, get_cdi, tmp_path, settings):
+    settings.SUGGESTION_INDEX_MAX_AGE = 0
+    create_offer(create_professional, 'Développeur Python', '75011', 'Paris', 40000, [get_cdi])
+    output = tmp_path / 'report.json'
+    call_command('benchmark_suggestions', iterations=2, output=str(output), stdout=StringIO())
+
+    report = json.loads(output.read_text())
+    assert report['offers'] == 1
+    assert set(report['keystrokes']['Dév']) == {'suggestions', 'search_offers'}
+    assert report['keystrokes']['Dév']['suggestions']['queries'] == 0
+    assert report['keystrokes']['Dév']['search_offers']['queries'] == 1
+
+
+@pytest.fixture
+def zip_codes_csv(tmp_path):
+    path = tmp_path / 'zip_codes.csv'
+    # Semicolon separated, one row per commune as in the La Poste dataset
+    path.write_text(
+        'code_commune_insee;nom_de_la_commune;code_postal;coordonnees_gps\n'
+        '77468;SERRIS;77700;48.84, 2.78\n'
+        '77018;BAILLY ROMAINVILLIERS;77700;48.86, 2.80\n'
+        '77284;MEAUX;77100;48.96, 2.88\n'
+        '75111;PARIS 11;75011;48.86, 2.38\n'
+        '69381;LYON 01;69001;45.77, 4.83\n'
+        '99999;NOWHERE;99999;\n',
+        encoding='utf-8'
+    )
+    return path
+
+
+@pytest.mark.django_db
+def test_load_zip_codes_command(create_professional, create_contract_types, get_cdi, zip_codes_csv, tmp_path):
+    from offers.models import OfferSearchDocument, ZipCode
+
+    offer = create_offer(create_professional, 'Comptable', '77700', 'Serris', 30000, [get_cdi])
+    assert OfferSearchDocument.objects.get(offer=offer).latitude is None
+
+    out = StringIO()
+    call_command('load_zip_codes', str(zip_codes_csv), stdout=out)
+    assert 'Loaded 4 zip codes, located 1 offers.' in out.getvalue()
+    serris = ZipCode.objects.get(code='77700')
+    assert (serris.latitude, serris.longitude) == pytest.approx((48.85, 2.79))
+    document = OfferSearchDocument.objects.get(offer=offer)
+    assert (document.latitude, document.longitude) == pytest.approx((48.85, 2.79))
+
+    # Comma separated, latitude and longitude columns, codes updated in place
+    other = tmp_path / 'other.csv'
+    other.write_text('zip,latitude,longitude\n77700,48.0,2.0\n')
+    call_command('load_zip_codes', str(other), stdout=StringIO())
+    assert ZipCode.objects.count() == 4
+    document.refresh_from_db()
+    assert (document.latitude, document.longitude) == (48.0, 2.0)
+
+    # New offers are located by the search document trigger
+    offer = create_offer(create_professional, 'Comptable', '69001', 'Lyon', 30000, [get_cdi])
+    assert OfferSearchDocument.objects.get(offer=offer).latitude == 45.77
+
+    other.write_text('insee,latitude,longitude\n77468,48.0,2.0\n')
+    with pytest.raises(CommandError):
+        call_command('load_zip_codes', str(other), stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_search_within_radius(api_client, create_professional, create_contract_types, get_cdi, zip_codes_csv):
+    call_command('load_zip_codes', str(zip_codes_csv), stdout=StringIO())
+    create_offer(create_professional, 'Comptable', '77100', 'Meaux', 30000, [get_cdi])
+    create_offer(create_professional, 'Comptable', '75011', 'Paris', 30000, [get_cdi])
+    create_offer(create_professional, 'Comptable', '77700', 'Serris', 30000, [get_cdi])
+    create_offer(create_professional, 'Développeur', '77700', 'Serris', 30000, [get_cdi])
+    create_offer(create_professional, 'Comptable', '69001', 'Lyon', 30000, [get_cdi])
+
+    # Closest first: Serris, Meaux (~13 km), Paris (~30 km)
+    response = api_client.get('/offers/', {'near': '77700', 'radius': 35})
+    assert response.status_code == status.HTTP_200_OK
+    assert [o['city'] for o in response.json()['offers']] == ['Serris', 'Serris', 'Meaux', 'Paris']
+    response = api_client.get('/offers/', {'near': '77700', 'cursor': ''})
+    assert [o['city'] for o in response.json()['offers']] == ['Serris', 'Serris', 'Meaux']
+
+    # Combined with the other filters, the rank still comes first
+    response = api_client.get('/offers/', {'near': '77700', 'radius': 35, 'title': 'comptable'})
+    assert [o['city'] for o in response.json()['offers']] == ['Serris', 'Meaux', 'Paris']
+
+    assert api_client.get('/offers/', {'near': '12345'}).json()['offers'] == []
+    for radius in ['far', '0', '1000']:
+        response = api_client.get('/offers/', {'near': '77700', 'radius': radius})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'radius' in response.json()
+
+
+@pytest.fixture
+def seeded_offers(create_professional):
+    """
+    Enough analyzed offers for the planner to prefer selective indexes.
+    """
+    call_command('create_offers', count=2000, seed=3, stdout=StringIO())
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE offers_offersearchdocument, offers_offer')
+
+
+@pytest.mark.django_db
+def test_search_within_radius_uses_location_index(create_professional, create_contract_types, get_cdi, zip_codes_csv):
+    call_command('load_zip_codes', str(zip_codes_csv), stdout=StringIO())
+    create_offer(create_professional, 'Comptable', '77700', 'Serris', 30000, [get_cdi])
+
+    offers = Offer.search_offers('', '', '', [], '77700', 30)
+    with CaptureQueriesContext(connection) as captured:
+        assert [o.city for o in offers] == ['Serris']
+    assert len(captured) == 1
+    assert offers[0].distance == pytest.approx(0, abs=1)
+
+    call_command('create_offers', count=2000, seed=3, stdout=StringIO())
+    call_command('load_zip_codes', str(zip_codes_csv), stdout=StringIO())
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE offers_offersearchdocument, offers_offer')
+
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = offers.all()[:10].explain()
+    assert 'offer_document_location' in plan
+
+
+@pytest.mark.django_db
+def test_search_salary_range_and_sort(api_client, create_professional, create_contract_types, get_cdi):
+    for title, salary in [
+        ('Comptable', 30000), ('Développeur', 45000), ('Comptable', 50000),
+        ('Développeur', 60000), ('Développeur', 45000),
+    ]:
+        create_offer(create_professional, title, '75011', 'Paris', salary, [get_cdi])
+
+    def salaries(**params):
+        response = api_client.get('/offers/', params)
+        assert response.status_code == status.HTTP_200_OK
+        return [o['salary'] for o in response.json()['offers']]
+
+    assert sorted(salaries(salary_min=40000, salary_max=50000)) == [45000, 45000, 50000]
+    assert salaries(salary_min=40000, sort='salary') == [45000, 45000, 50000, 60000]
+    assert salaries(salary_max=50000, sort='-salary') == [50000, 45000, 45000, 30000]
+    assert salaries(title='développeur', salary_min=50000) == [60000]
+    assert salaries(title='développeur', sort='-salary') == [60000, 45000, 45000]
+
+    # Keyset pagination follows the salary order, ties broken by id
+    response = api_client.get('/offers/', {'salary_min': 0, 'sort': '-salary', 'cursor': ''})
+    offers = response.json()['offers']
+    assert [o['salary'] for o in offers] == [60000, 50000, 45000, 45000, 30000]
+    assert offers[2]['id'] > offers[3]['id']
+
+    for params in [
+        {'salary_min': 'high'}, {'salary_max': -1},
+        {'salary_min': 50000, 'salary_max': 40000}, {'title': 'comptable', 'sort': 'date'},
+    ]:
+        response = api_client.get('/offers/', params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.json()) & {'salary_min', 'salary_max', 'sort'}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('search, sort', [
+    ({'salary_min': 40000}, 'salary'),
+    ({'salary_max': 40000}, '-salary'),
+    ({'contract_ids': ['CDI']}, '-salary'),
+    ({'title': 'comptable', 'salary_min': 40000}, 'relevance'),
+])
+def test_search_salary_uses_index(seeded_offers, search, sort):
+    search = {'title': '', 'zip_code': '', 'city_str': '', 'contract_ids': [], **search}
+    search['contract_ids'] = [
+        ContractType.objects.get(name=name).id for name in search['contract_ids']
+    ]
+    offers = Offer.search_offers(**search, sort=sort)
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = offers[:10].explain()
+    assert 'offer_document_salary' in plan
+    if sort != 'relevance':
+        # Rows come out of the index in order, nothing is sorted
+        assert 'Sort' not in plan
+
+
+@pytest.mark.django_db
+def test_search_facets(api_client, create_professional, create_contract_types, get_cdi, get_cdd, settings):
+    for title, city, salary, contracts in [
+        ('Comptable', 'Paris', 18000, [get_cdi]),
+        ('Comptable', 'Paris', 35000, [get_cdi, get_cdd]),
+        ('Comptable', 'Lyon', 38000, [get_cdd]),
+        ('Comptable', 'Nantes', 80000, [get_cdi]),
+        ('Développeur', 'Paris', 45000, [get_cdi]),
+    ]:
+        create_offer(create_professional, title, '75011', city, salary, contracts)
+
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.get('/offers/', {'title': 'comptable', 'facets': 'contract,city,salary'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['facets'] == {
+        'contract': [
+            {'id': get_cdi.id, 'name': 'CDI', 'count': 3},
+            {'id': get_cdd.id, 'name': 'CDD', 'count': 2},
+        ],
+        'city': [
+            {'value': 'Paris', 'count': 2},
+            {'value': 'Lyon', 'count': 1},
+            {'value': 'Nantes', 'count': 1},
+        ],
+        'salary': [
+            {'min': None, 'max': 20000, 'count': 1},
+            {'min': 30000, 'max': 40000, 'count': 2},
+            {'min': 70000, 'max': None, 'count': 1},
+        ],
+    }
+    # Every facet is counted by a single statement
+    assert len([q for q in captured.captured_queries if 'unnest' in q['sql']]) == 1
+
+    # Paging through the same search reuses the cached counts
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.get('/offers/', {'title': 'comptable', 'facets': 'contract,city,salary', 'page': 2})
+    assert response.json()['facets']['city'][0] == {'value': 'Paris', 'count': 2}
+    assert not [q for q in captured.captured_queries if 'MATERIALIZED' in q['sql']]
+
+    settings.SEARCH_FACET_LIMIT = 1
+    response = api_client.get('/offers/', {'salary_min': 30000, 'facets': 'city', 'cursor': ''})
+    assert response.json()['facets'] == {'city': [{'value': 'Paris', 'count': 2}]}
+    assert 'facets' not in api_client.get('/offers/', {'title': 'comptable'}).json()
+
+    # Spellings of a city are counted together, as the city search folds them
+    for city in ['paris', 'PARÎS']:
+        create_offer(create_professional, 'Comptable', '75011', city, 30000, [get_cdi])
+    response = api_client.get('/offers/', {'title': 'comptable', 'facets': 'city'})
+    assert response.json()['facets']['city'][0] == {'value': 'Paris', 'count': 4}
+
+    # A blank search matches nothing, without running a query
+    response = api_client.get('/offers/', {'title': ' ', 'facets': 'city,salary'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['facets'] == {'city': [], 'salary': []}
+
+    response = api_client.get('/offers/', {'title': 'comptable', 'facets': 'city,date'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'facets' in response.json()
+
+
+@pytest.mark.django_db
+def test_my_offers_facets(api_client, create_professional, create_professional2, create_contract_types, get_cdi):
+    create_offer(create_professional, 'Comptable', '75011', 'Paris', 30000, [get_cdi])
+    create_offer(create_professional2, 'Comptable', '69001', 'Lyon', 30000, [get_cdi])
+
+    force_authenticate(api_client, create_professional)
+    response = api_client.get('/offers/', {'facets': 'city'})
+    assert response.json()['facets'] == {'city': [{'value': 'Paris', 'count': 1}]}
+
+
+@pytest.mark.django_db
+def test_export_offers(
+    api_client, create_professional, create_professional2, create_contract_types,
+    get_cdi, get_cdd, settings
+):
+    settings.OFFER_EXPORT_CHUNK_SIZE = 2
+    for i in range(5):
+        create_offer(create_professional, f'Développeur {i}', '75011', 'Paris', 40000 + i, [get_cdi, get_cdd])
+    create_offer(create_professional2, 'Comptable', '69001', 'Lyon', 30000, [get_cdi])
+    force_authenticate(api_client, create_professional)
+
+    response = api_client.get('/offers/export.ndjson')
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert response['Content-Disposition'] == 'attachment; filename="offers.ndjson"'
+    chunks = list(response.streaming_content)
+    # Five offers by chunks of two rows
+    assert len(chunks) == 3
+    lines = b''.join(chunks).decode().splitlines()
+    assert [json.loads(line) for line in lines][0] == {
+        'id': Offer.objects.filter(title='Développeur 0').get().id,
+        'title': 'Développeur 0', 'zip': '75011', 'city': 'Paris', 'salary': 40000,
+        'contract': [{'id': get_cdi.id, 'name': 'CDI'}, {'id': get_cdd.id, 'name': 'CDD'}],
+    }
+    assert [json.loads(line)['salary'] for line in lines] == [40000, 40001, 40002, 40003, 40004]
+
+    response = api_client.get('/offers/export.csv')
+    assert response['Content-Type'] == 'text/csv'
+    rows = b''.join(response.streaming_content).decode().splitlines()
+    assert rows[0] == 'id,title,zip,city,salary,contract'
+    assert rows[1].endswith(',Développeur 0,75011,Paris,40000,CDI|CDD')
+    assert len(rows) == 6
+
+    assert api_client.get('/offers/export.xml').status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_export_offers_with_access_token(
+    api_client, create_professional, create_professional2, create_contract_types, get_cdi
+):
+    from accounts.tokens import ProfileRefreshToken
+
+    create_offer(create_professional, 'Développeur', '75011', 'Paris', 40000, [get_cdi])
+    create_offer(create_professional2, 'Comptable', '69001', 'Lyon', 30000, [get_cdi])
+    token = ProfileRefreshToken.for_user(create_professional).access_token
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    for export_format in ['ndjson', 'csv']:
+        response = api_client.get(f'/offers/export.{export_format}')
+        assert response.status_code == status.HTTP_200_OK
+        content = b''.join(response.streaming_content).decode()
+        assert 'Développeur' in content and 'Comptable' not in content
+
+
+@pytest.mark.django_db
+def test_export_offers_permissions(api_client, create_user):
+    assert api_client.get('/offers/export.csv').status_code == status.HTTP_401_UNAUTHORIZED
+    force_authenticate(api_client, create_user)
+    assert api_client.get('/offers/export.csv').status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_offer_dict_matches_offer_serializer(
+    api_client, create_professional, create_contract_types, get_cdi, get_cdd, get_freelance
+):
+    from offers.serializers import OfferSerializer
+
+    offer = create_offer(create_professional, 'Développeur Python', '75011', 'Paris', 40000, [get_freelance, get_cdi])
+    create_offer(create_professional, 'Comptable', '69001', 'Lyon', 30000, [get_cdd])
+
+    def by_contract_id(data):
+        return {**data, 'contract': sorted(data['contract'], key=lambda c: c['id'])}
+
+    expected = by_contract_id(OfferSerializer(Offer.objects.get(pk=offer.pk)).data)
+    response = api_client.get(f'/offers/{offer.pk}/')
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == expected
+    assert list(response.json()) == list(expected)
+
+    serialized = [by_contract_id(o) for o in OfferSerializer(Offer.objects.order_by('id'), many=True).data]
+    force_authenticate(api_client, create_professional)
+    assert api_client.get('/offers/').json()['offers'] == serialized
+    assert api_client.get('/offers/', {'cursor': ''}).json()['offers'] == serialized
+    assert api_client.get('/offers/', {'title': 'développeur'}).json()['offers'] == serialized[:1]
+
+    # Without orjson the standard library encodes the same document
+    with patch('offers.serializers.orjson', None):
+        assert api_client.get(f'/offers/{offer.pk}/').json() == expected
+    assert api_client.get('/offers/999999/').status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_benchmark_serializers_command(create_professional, create_contract_types, get_cdi, tmp_path):
+    for i in range(4):
+        create_offer(create_professional, f'Comptable {i}', '75011', 'Paris', 30000, [get_cdi])
+    output = tmp_path / 'report.json'
+    call_command('benchmark_serializers', sizes='2,4', iterations=2, output=str(output), stdout=StringIO())
+
+    report = json.loads(output.read_text())
+    assert report['encoder'] == 'orjson'
+    assert set(report['sizes']['4']) == {'serializer', 'fast', 'serializer_encode', 'fast_encode'}
+    assert report['sizes']['4']['fast']['queries'] == 1
+    assert report['sizes']['4']['serializer']['queries'] == 2
+    assert report['sizes']['4']['fast_encode']['queries'] == 0
+
+    with pytest.raises(CommandError):
+        call_command('benchmark_serializers', sizes='10', iterations=1, output=str(output), stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_page_size_and_count_modes(api_client, create_professional, create_contract_types, get_cdi, settings):
+    for i in range(7):
+        create_offer(create_professional, f'Comptable {i}', '75011', 'Paris', 30000 + i, [get_cdi])
+    search = {'title': 'comptable', 'sort': 'salary'}
+
+    response = api_client.get('/offers/', {**search, 'page_size': 3, 'page': 3})
+    assert [o['salary'] for o in response.json()['offers']] == [30006]
+    assert response.json()['total_pages'] == 3
+    response = api_client.get('/offers/', {**search, 'page_size': 5, 'cursor': ''})
+    assert len(response.json()['offers']) == 5
+
+    # No COUNT(*), the next page is detected from one extra row
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.get('/offers/', {**search, 'page_size': 3, 'page': 2, 'count': 'none'})
+    data = response.json()
+    assert [o['salary'] for o in data['offers']] == [30003, 30004, 30005]
+    assert (data['page'], data['has_next']) == (2, True)
+    assert 'total_pages' not in data
+    assert not [q for q in captured.captured_queries if 'COUNT(' in q['sql'].upper()]
+    data = api_client.get('/offers/', {**search, 'page_size': 3, 'page': 3, 'count': 'none'}).json()
+    assert (len(data['offers']), data['has_next']) == (1, False)
+    data = api_client.get('/offers/', {**search, 'page': 'x', 'count': 'none'}).json()
+    assert data['page'] == 1
+    assert api_client.get('/offers/', {**search, 'page': 9, 'count': 'none'}).json()['offers'] == []
+
+    # Small result sets are counted exactly, large ones estimated
+    data = api_client.get('/offers/', {**search, 'page_size': 3, 'count': 'estimate'}).json()
+    assert (data['estimated_count'], data['total_pages'], data['has_next']) == (7, 3, True)
+    data = api_client.get('/offers/', {'title': ' ', 'count': 'estimate'}).json()
+    assert (data['offers'], data['estimated_count'], data['total_pages']) == ([], 0, 1)
+    settings.OFFER_COUNT_ESTIMATE_THRESHOLD = -1
+    data = api_client.get('/offers/', {'title': ' ', 'count': 'estimate'}).json()
+    assert data['estimated_count'] == 0
+    with CaptureQueriesContext(connection) as captured:
+        data = api_client.get('/offers/', {**search, 'count': 'estimate'}).json()
+    assert isinstance(data['estimated_count'], int)
+    assert any(q['sql'].startswith('EXPLAIN') for q in captured.captured_queries)
+    assert not [q for q in captured.captured_queries if 'COUNT(' in q['sql'].upper()]
+
+    settings.OFFER_MAX_PAGE_SIZE = 5
+    for params in [{'page_size': 6}, {'page_size': 0}, {'page_size': 'all'}, {'count': 'approx'}]:
+        response = api_client.get('/offers/', {**search, **params})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.json()) & {'page_size', 'count'}
+
+
+@pytest.mark.django_db
+def test_offer_timestamps(create_professional, create_contract_types, get_cdi, get_cdd):
+    offer = create_offer(create_professional, 'Comptable', '75011', 'Paris', 30000, [get_cdi])
+    offer.refresh_from_db()
+    assert offer.created_at and offer.updated_at >= offer.created_at
+    created_at, updated_at = offer.created_at, offer.updated_at
+
+    offer.contract.add(get_cdd)
+    offer.refresh_from_db()
+    assert offer.updated_at > updated_at
+    updated_at = offer.updated_at
+
+    # Changes made from the contract type side bump the offer too
+    get_cdi.offer_set.remove(offer)
+    offer.refresh_from_db()
+    assert offer.updated_at > updated_at
+    updated_at = offer.updated_at
+    get_cdd.offer_set.clear()
+    offer.refresh_from_db()
+    assert offer.updated_at > updated_at
+    assert offer.created_at == created_at
+
+
+@pytest.mark.django_db
+def test_offer_conditional_requests(api_client, create_professional, create_contract_types, get_cdi):
+    offer = create_offer(create_professional, 'Comptable', '75011', 'Paris', 30000, [get_cdi])
+    create_offer(create_professional, 'Développeur', '69001', 'Lyon', 40000, [get_cdi])
+    url = f'/offers/{offer.pk}/'
+
+    response = api_client.get(url)
+    etag, last_modified = response['ETag'], response['Last-Modified']
+    assert etag.startswith('"')
+    with patch('offers.views.offer_dict') as offer_dict:
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == status.HTTP_304_NOT_MODIFIED
+    offer_dict.assert_not_called()
+    assert response['ETag'] == etag and not response.content
+
+    # Pages carry a weak ETag following the offers they hold
+    force_authenticate(api_client, create_professional)
+    search = {'title': 'comptable'}
+    response = api_client.get('/offers/', search)
+    page_etag = response['ETag']
+    assert page_etag.startswith('W/"') and 'Last-Modified' not in response
+    with patch('offers.views.offer_dict') as offer_dict:
+        response = api_client.get('/offers/', search, HTTP_IF_NONE_MATCH=page_etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    offer_dict.assert_not_called()
+    assert api_client.get('/offers/', {'title': 'développeur'})['ETag'] != page_etag
+
+    offer.salary = 31000
+    offer.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK and response['ETag'] != etag
+    response = api_client.get('/offers/', search, HTTP_IF_NONE_MATCH=page_etag)
+    assert response.status_code == status.HTTP_200_OK
+    page_etag = response['ETag']
+
+    offer.delete()
+    response = api_client.get('/offers/', search, HTTP_IF_NONE_MATCH=page_etag)
+    assert response.status_code == status.HTTP_200_OK and response.json()['offers'] == []
+
+
+@pytest.mark.django_db
+def test_anonymous_offer_feed(
+    api_client, create_professional, create_contract_types, get_cdi, settings,
+    django_capture_on_commit_callbacks
+):
+    settings.OFFER_FEED_SIZE = 5
+    offers = [
+        create_offer(create_professional, f'Comptable {i}', '75011', 'Paris', 30000, [get_cdi])
+        for i in range(8)
+    ]
+    newest = [offer.id for offer in reversed(offers)]
+
+    # Pages past the cached ids are read from the table with the same cursors
+    pages, cursor = [], ''
+    while cursor is not None:
+        data = api_client.get('/offers/', {'page_size': 3, 'cursor': cursor}).json()
+        pages.append([o['id'] for o in data['offers']])
+        cursor = data['next']
+    assert pages == [newest[:3], newest[3:6], newest[6:]]
+    assert data['previous']
+    data = api_client.get('/offers/', {'page_size': 3, 'cursor': data['previous']}).json()
+    assert [o['id'] for o in data['offers']] == newest[3:6]
+    data = api_client.get('/offers/', {'page_size': 3, 'cursor': data['previous']}).json()
+    assert [o['id'] for o in data['offers']] == newest[:3]
+    assert data['previous'] is None
+
+    # A cursor at the newest offer has nothing before it
+    from offers.pagination import encode_cursor
+    data = api_client.get('/offers/', {'page_size': 3, 'cursor': encode_cursor([newest[0] + 1])}).json()
+    assert [o['id'] for o in data['offers']] == newest[:3]
+    assert data['previous'] is None
+
+    # Writes patch the cached ids, and a page costs one query by primary key
+    with django_capture_on_commit_callbacks(execute=True):
+        offer = create_offer(create_professional, 'Développeur', '69001', 'Lyon', 40000, [get_cdi])
+    with django_capture_on_commit_callbacks(execute=True):
+        Offer.objects.get(pk=newest[0]).delete()
+    with CaptureQueriesContext(connection) as captured:
+        data = api_client.get('/offers/', {'page_size': 3}).json()
+    assert [o['id'] for o in data['offers']] == [offer.id, *newest[1:3]]
+    assert len(captured.captured_queries) == 1
+    assert 'COUNT(' not in captured.captured_queries[0]['sql'].upper()
+    assert data['previous'] is None and data['next']
+
+    for params in [{'facets': 'city'}, {'cursor': 'garbage'}]:
+        response = api_client.get('/offers/', params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_update_offer_feed(settings):
+    from django.core.cache import cache
+    from offers.cache import FEED_GENERATION_KEY, FEED_KEY, get_offer_feed, update_offer_feed
+
+    settings.OFFER_FEED_SIZE = 3
+    assert get_offer_feed() == {'ids': [], 'complete': True}
+
+    def feed():
+        return cache.get(FEED_KEY.format(generation=cache.get(FEED_GENERATION_KEY)))
+
+    update_offer_feed(created=[1, 2])
+    assert feed() == {'ids': [2, 1], 'complete': True}
+    update_offer_feed(created=[3, 4])
+    assert feed() == {'ids': [4, 3, 2], 'complete': False}
+    # Older ids than the last one of a truncated list are left out
+    update_offer_feed(created=[1], deleted=[3])
+    assert feed() == {'ids': [4, 2], 'complete': False}
+
+    # A missing generation is reloaded by the next read
+    cache.delete(FEED_KEY.format(generation=cache.get(FEED_GENERATION_KEY)))
+    update_offer_feed(created=[5])
+    assert feed() is None
+    cache.delete(FEED_GENERATION_KEY)
+    update_offer_feed(created=[5])
+    assert feed() is None and cache.get(FEED_GENERATION_KEY)
+
+    # Entries expire, in case a process missed an update
+    with patch.object(cache, 'set', wraps=cache.set) as cache_set:
+        get_offer_feed()
+        update_offer_feed(created=[6])
+    assert [c.args[2] for c in cache_set.call_args_list] == [settings.OFFER_FEED_TIMEOUT] * 2
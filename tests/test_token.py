@@ -58,4 +58,272 @@ class TestRefreshTokenView:
 
         # Assert that the response is Unauthorized (401) and contains the expected error message
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
-        assert response.data['detail'] == 'User not found'
\ No newline at end of file
+        assert response.data['detail'] == 'User not found'
+
+def login(api_client, username):
+    response = api_client.post(
+        reverse('login'), {'username': username, 'password': 'testpass'}, format='json'
+    )
+    return response.data['access_token']
+
+
+def user_queries(captured):
+    return [
+        q['sql'] for q in captured.captured_queries
+        if 'auth_user' in q['sql'] or 'accounts_profile' in q['sql']
+    ]
+
+
+@pytest.mark.django_db
+def test_access_token_carries_profile_claims(api_client, create_professional):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    token = AccessToken(login(api_client, 'testuserpro'))
+    assert token['user_id'] == create_professional.id
+    assert token['is_professional'] is True
+    assert token['is_particular'] is False
+
+
+@pytest.mark.django_db
+def test_stateless_authentication_skips_user_queries(
+    api_client, create_professional, create_contract_types, get_cdi
+):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from offers.models import Offer
+
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {login(api_client, "testuserpro")}')
+    data = {'title': 'Offer', 'zip': '75001', 'city': 'Paris', 'salary': 40000, 'contract': [get_cdi.id]}
+    with CaptureQueriesContext(connection) as captured:
+        assert api_client.post(reverse('offer-create'), data, format='json').status_code == 201
+        response = api_client.get(reverse('offer-list'))
+    assert user_queries(captured) == []
+    assert response.json()['offers'][0]['title'] == 'Offer'
+
+    offer = Offer.objects.get()
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.put(
+            reverse('offer-update', args=[offer.pk]), dict(data, salary=45000), format='json'
+        )
+    assert response.status_code == 200
+    assert user_queries(captured) == []
+
+
+@pytest.mark.django_db
+def test_stateless_permissions(api_client, create_user, create_professional):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {login(api_client, "testuser")}')
+    response = api_client.post(reverse('offer-create'), {}, format='json')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = api_client.get(reverse('user'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['username'] == 'testuser'
+
+
+@pytest.mark.django_db
+def test_tokens_without_profile_claims(api_client, create_professional):
+    token = RefreshToken.for_user(create_professional).access_token
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    response = api_client.post(reverse('offer-create'), {}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_logout_revokes_tokens(api_client, create_user):
+    access_token = login(api_client, 'testuser')
+    refresh_token = api_client.cookies['refresh_token'].value
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+    assert api_client.get(reverse('user')).status_code == status.HTTP_200_OK
+
+    assert api_client.post(reverse('logout')).status_code == status.HTTP_200_OK
+    assert api_client.get(reverse('user')).status_code == status.HTTP_401_UNAUTHORIZED
+
+    api_client.credentials()
+    response = api_client.post(
+        TestRefreshTokenView.url, HTTP_COOKIE=f'refresh_token={refresh_token}'
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_login_after_revocation(api_client, create_user):
+    from accounts.tokens import revoke_user_tokens
+
+    access_token = login(api_client, 'testuser')
+    revoke_user_tokens(create_user.id)
+    # Logging in again within the same second gives a working token
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {login(api_client, "testuser")}')
+    assert api_client.get(reverse('user')).status_code == status.HTTP_200_OK
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+    assert api_client.get(reverse('user')).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_admin_rights_changes_revoke_tokens(api_client, create_user):
+    from django.contrib.auth.models import User
+
+    url = reverse('search-cache-stats')
+    create_user.is_staff = True
+    create_user.save()
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {login(api_client, "testuser")}')
+    assert api_client.get(url).status_code == status.HTTP_200_OK
+
+    # Saving without changing the flags keeps the token
+    user = User.objects.get(pk=create_user.pk)
+    user.first_name = 'Test'
+    user.save()
+    assert api_client.get(url).status_code == status.HTTP_200_OK
+
+    user.is_staff = False
+    user.save()
+    assert api_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    api_client.credentials()
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {login(api_client, "testuser")}')
+    assert api_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+    user = User.objects.get(pk=create_user.pk)
+    user.is_superuser = True
+    user.save()
+    assert api_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_deactivation_revokes_tokens(api_client, create_user):
+    access_token = login(api_client, 'testuser')
+    refresh_token = api_client.cookies['refresh_token'].value
+    create_user.is_active = False
+    create_user.save()
+
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+    assert api_client.get(reverse('user')).status_code == status.HTTP_401_UNAUTHORIZED
+    api_client.credentials()
+    response = api_client.post(
+        TestRefreshTokenView.url, HTTP_COOKIE=f'refresh_token={refresh_token}'
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_blacklist_checks_use_cache(create_user, django_assert_num_queries, settings):
+    from django.core.cache import cache
+    from rest_framework_simplejwt.exceptions import TokenError
+    from accounts.tokens import ProfileRefreshToken
+
+    settings.TOKEN_BLACKLIST_CACHE = True
+    refresh_token = str(ProfileRefreshToken.for_user(create_user))
+    with django_assert_num_queries(0):
+        ProfileRefreshToken(refresh_token)
+
+    ProfileRefreshToken(refresh_token).blacklist()
+    with django_assert_num_queries(0):
+        with pytest.raises(TokenError):
+            ProfileRefreshToken(refresh_token)
+
+    cache.clear()
+    with django_assert_num_queries(1):
+        with pytest.raises(TokenError):
+            ProfileRefreshToken(refresh_token)
+    with django_assert_num_queries(0):
+        with pytest.raises(TokenError):
+            ProfileRefreshToken(refresh_token)
+
+    # A process-local cache could miss blacklistings by other processes
+    settings.TOKEN_BLACKLIST_CACHE = False
+    other_token = str(ProfileRefreshToken.for_user(create_user))
+    with django_assert_num_queries(1):
+        ProfileRefreshToken(other_token)
+    with django_assert_num_queries(1):
+        with pytest.raises(TokenError):
+            ProfileRefreshToken(refresh_token)
+
+
+@pytest.mark.django_db
+def test_purge_expired_tokens(create_user):
+    from datetime import timedelta
+    from django.utils import timezone
+    from prometheus_client import REGISTRY
+    from rest_framework_simplejwt.token_blacklist.models import (
+        BlacklistedToken,
+        OutstandingToken,
+    )
+    from accounts.tasks import purge_expired_tokens
+
+    now = timezone.now()
+    for i in range(5):
+        token = OutstandingToken.objects.create(
+            user=create_user, jti=f'expired-{i}', token='', expires_at=now - timedelta(days=1)
+        )
+        if i % 2:
+            BlacklistedToken.objects.create(token=token)
+    live = OutstandingToken.objects.create(
+        user=create_user, jti='live', token='', expires_at=now + timedelta(days=1)
+    )
+    BlacklistedToken.objects.create(token=live)
+
+    assert purge_expired_tokens(batch_size=2) == 5
+    assert list(OutstandingToken.objects.values_list('jti', flat=True)) == ['live']
+    assert BlacklistedToken.objects.get().token == live
+    assert REGISTRY.get_sample_value('jwt_token_table_rows', {'table': 'outstanding'}) == 1
+    assert REGISTRY.get_sample_value('jwt_token_table_rows', {'table': 'blacklisted'}) == 1
+
+
+@pytest.mark.django_db
+def test_refresh_rotates_and_blacklists(api_client, create_user, django_assert_num_queries, settings):
+    from accounts.tokens import ProfileRefreshToken
+
+    settings.TOKEN_BLACKLIST_CACHE = True
+    refresh_token = str(ProfileRefreshToken.for_user(create_user))
+    # user and profile, blacklist the old token, record the new one, and
+    # the savepoints of the transaction and of get_or_create
+    with django_assert_num_queries(9):
+        response = api_client.post(
+            TestRefreshTokenView.url, HTTP_COOKIE=f'refresh_token={refresh_token}'
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.cookies['refresh_token'].value != refresh_token
+
+    # A rotated token cannot be used again
+    response = api_client.post(
+        TestRefreshTokenView.url, HTTP_COOKIE=f'refresh_token={refresh_token}'
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.data['detail'] == 'Invalid refresh token'
+
+
+@pytest.mark.django_db
+def test_refresh_token_reused_concurrently(api_client, create_user):
+    from django.core.cache import cache
+    from accounts.tokens import ProfileRefreshToken
+
+    refresh_token = str(ProfileRefreshToken.for_user(create_user))
+    ProfileRefreshToken(refresh_token).blacklist()
+    # Another process rotated the token after our blacklist check
+    with patch.object(ProfileRefreshToken, 'check_blacklist'):
+        response = api_client.post(
+            TestRefreshTokenView.url, HTTP_COOKIE=f'refresh_token={refresh_token}'
+        )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.data['detail'] == 'Invalid refresh token'
+
+
+@pytest.mark.django_db
+def test_loadtest_refresh_command(tmp_path):
+    import json
+    from io import StringIO
+    from django.core.management import call_command
+
+    output = tmp_path / 'refresh.json'
+    out = StringIO()
+    call_command('loadtest_refresh', requests=5, concurrency=1, output=str(output), stdout=out)
+    assert '5 refreshes' in out.getvalue()
+    report = json.loads(output.read_text())['refresh']
+    assert report['iterations'] == 5
+    assert report['failures'] == 0
+
+    from django.core.management.base import CommandError
+    from config.benchmarking import summarize
+    with pytest.raises(CommandError):
+        call_command('loadtest_refresh', requests=0, stdout=StringIO())
+    assert summarize([]) == {
+        'iterations': 0, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None,
+    }